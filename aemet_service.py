@@ -8,19 +8,22 @@ Flujo AEMET en dos pasos:
 """
 import base64
 import time
+from threading import Lock
 from datetime import date, datetime, timedelta
+from functools import lru_cache
 from typing import Optional, Dict, List
-from zoneinfo import ZoneInfo
 
 import requests
 import config
+from timezones import MADRID_TZ
 
 AEMET_BASE = "https://opendata.aemet.es/opendata"
-MADRID_TZ = ZoneInfo("Europe/Madrid")
 
 # Protección anti-rate-limit: delay entre peticiones consecutivas a AEMET
 _LAST_AEMET_REQUEST_TIME = 0.0
 _MIN_REQUEST_INTERVAL = 0.8  # segundos entre peticiones (evita rate-limit)
+# Serializa la reserva de turno: varios hilos pueden llamar a AEMET a la vez
+_AEMET_RATE_LOCK = Lock()
 
 # Reintentos ante HTTP 429 (rate-limit AEMET)
 _MAX_RETRIES = 2
@@ -54,13 +57,6 @@ def _aemet_get(endpoint: str, timeout: int = 15) -> Optional[dict]:
     # Limpiar caché si es necesario
     _clear_cache_if_needed()
     
-    # Protección rate-limit: esperar si la última petición fue muy reciente
-    time_since_last = time.time() - _LAST_AEMET_REQUEST_TIME
-    if time_since_last < _MIN_REQUEST_INTERVAL:
-        sleep_time = _MIN_REQUEST_INTERVAL - time_since_last
-        print(f"⏳ Rate-limit protection: esperando {sleep_time:.1f}s antes de AEMET {endpoint[:40]}")
-        time.sleep(sleep_time)
-    
     api_key = _api_key()
     if not api_key:
         print("AEMET_API_KEY no configurada")
@@ -68,9 +64,16 @@ def _aemet_get(endpoint: str, timeout: int = 15) -> Optional[dict]:
 
     url = f"{AEMET_BASE}{endpoint}"
     for attempt in range(_MAX_RETRIES + 1):
-        try:
-            _LAST_AEMET_REQUEST_TIME = time.time()  # Marcar timestamp
+        # Protección rate-limit: cada hilo reserva su turno bajo lock y espera fuera de él
+        with _AEMET_RATE_LOCK:
+            now = time.time()
+            sleep_time = max(0.0, _LAST_AEMET_REQUEST_TIME + _MIN_REQUEST_INTERVAL - now)
+            _LAST_AEMET_REQUEST_TIME = now + sleep_time  # Marcar timestamp
             _AEMET_REQUEST_COUNT += 1  # Incrementar contador
+        if sleep_time > 0:
+            print(f"⏳ Rate-limit protection: esperando {sleep_time:.1f}s antes de AEMET {endpoint[:40]}")
+            time.sleep(sleep_time)
+        try:
             resp = requests.get(
                 url,
                 params={"api_key": api_key},
@@ -150,9 +153,11 @@ def get_aemet_request_count() -> int:
 
 
 def _url_has_image(url: str, timeout: int = 5) -> bool:
-    # Usar caché para evitar verificaciones repetidas
-    if url in _URL_AVAILABILITY_CACHE:
-        return _URL_AVAILABILITY_CACHE[url]
+    # Usar caché para evitar verificaciones repetidas (.get: el caché puede
+    # limpiarse desde otro hilo entre la comprobación y la lectura)
+    cached = _URL_AVAILABILITY_CACHE.get(url)
+    if cached is not None:
+        return cached
     
     result = False
     try:
@@ -323,6 +328,20 @@ def get_prediccion_llanera() -> Optional[dict]:
 
 # ──────────────── Avisos CAP Asturias ──────────────────────────────────────
 
+@lru_cache(maxsize=64)
+def _parse_cap_time(raw: str) -> Optional[datetime]:
+    """Parsea una fecha ISO de aviso CAP ('Z' incluida); None si no es válida."""
+    try:
+        return datetime.fromisoformat(raw.replace("Z", "+00:00"))
+    except (ValueError, AttributeError):
+        return None
+
+
+# Avisos CAP: peso para ordenar (rojo primero) e icono por nivel
+_CAP_LEVEL_WEIGHT = {"rojo": 3, "naranja": 2, "amarillo": 1}
+_CAP_LEVEL_ICON = {"rojo": "🔴", "naranja": "🟠", "amarillo": "🟡"}
+
+
 def get_avisos_cap_asturias() -> Optional[str]:
     """
     Obtiene avisos meteorológicos CAP activos para Asturias (área 33).
@@ -343,7 +362,6 @@ def get_avisos_cap_asturias() -> Optional[str]:
 
         now = datetime.now(MADRID_TZ)
         lines = []
-        niveles_peso = {"rojo": 3, "naranja": 2, "amarillo": 1}
 
         for aviso in avisos:
             if not isinstance(aviso, dict):
@@ -363,35 +381,35 @@ def get_avisos_cap_asturias() -> Optional[str]:
             effective_raw = aviso.get("effective") or aviso.get("onset") or ""
             expires_raw = aviso.get("expires") or aviso.get("expiry") or ""
 
-            # Intentar parsear fechas para filtrar avisos caducados
-            try:
-                if expires_raw:
-                    expires_dt = datetime.fromisoformat(expires_raw.replace("Z", "+00:00"))
-                    if expires_dt < now:
-                        continue
-            except Exception:
-                pass
-
-            # Formatear intervalo horario
+            # Cada fecha se parsea una sola vez (None si no es ISO válida)
+            effective_dt = _parse_cap_time(effective_raw) if effective_raw else None
+            expires_dt = _parse_cap_time(expires_raw) if expires_raw else None
+
+            # Filtrar avisos caducados
             try:
-                eff_str = datetime.fromisoformat(effective_raw.replace("Z", "+00:00")).strftime("%d/%m %H:%Mh") if effective_raw else "?"
-                exp_str = datetime.fromisoformat(expires_raw.replace("Z", "+00:00")).strftime("%d/%m %H:%Mh") if expires_raw else "?"
-                intervalo = f"{eff_str}→{exp_str}"
-            except Exception:
+                if expires_dt is not None and expires_dt < now:
+                    continue
+            except TypeError:
+                pass  # fecha sin zona horaria: no se puede comparar, se muestra
+
+            # Formatear intervalo horario (vacío si alguna fecha presente no se pudo parsear)
+            if (effective_raw and effective_dt is None) or (expires_raw and expires_dt is None):
                 intervalo = ""
+            else:
+                eff_str = effective_dt.strftime("%d/%m %H:%Mh") if effective_dt else "?"
+                exp_str = expires_dt.strftime("%d/%m %H:%Mh") if expires_dt else "?"
+                intervalo = f"{eff_str}→{exp_str}"
 
             descripcion = (aviso.get("descripcion") or aviso.get("description") or "").strip()
             umbral = (aviso.get("umbral") or "").strip()
 
-            nivel_ico = {"rojo": "🔴", "naranja": "🟠", "amarillo": "🟡"}.get(nivel, "⚠️")
-            linea = f"{nivel_ico} AVISO {nivel.upper()} {parametro}"
-            if umbral:
-                linea += f": {umbral}"
-            elif descripcion:
-                linea += f": {descripcion[:80]}"
-            if intervalo:
-                linea += f" — {intervalo}"
-            lines.append((niveles_peso.get(nivel, 0), linea))
+            detalle = umbral or descripcion[:80]
+            linea = (
+                f"{_CAP_LEVEL_ICON.get(nivel, '⚠️')} AVISO {nivel.upper()} {parametro}"
+                f"{': ' + detalle if detalle else ''}"
+                f"{' — ' + intervalo if intervalo else ''}"
+            )
+            lines.append((_CAP_LEVEL_WEIGHT.get(nivel, 0), linea))
 
         if not lines:
             return None
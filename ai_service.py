@@ -6,16 +6,28 @@ import config
 import math
 from typing import Optional, Dict
 from threading import Lock, local
-from datetime import datetime, timedelta
-from zoneinfo import ZoneInfo
+from datetime import date, datetime, timedelta
+from timezones import MADRID_TZ as _MADRID_TZ
 from telegram_monitor import send_alert as _tg_alert
 
 
 _RATE_LIMIT_LOCK = Lock()
 _FORCED_FALLBACK_CYCLE: Dict[tuple, str] = {}
 _AI_EXECUTION_CONTEXT = local()
-_MADRID_TZ = ZoneInfo("Europe/Madrid")
 _UPDATE_SLOTS = list(range(6, 24))  # Ciclos de 06:00 a 23:00
+# Horario operativo de LEMR (hora local): abre a las 09:00 y cierra a las 20:00 en
+# invierno o a las 21:00 (hora completa anterior a las 21:45) de abril a septiembre
+_OPEN_HOUR = 9
+_SUMMER_MONTHS = frozenset(range(4, 10))
+_CLOSE_HOUR_SUMMER = 21
+_CLOSE_HOUR_WINTER = 20
+# Modelo principal de la cascada y si es de bajo límite de tokens (mini/small):
+# la configuración no cambia durante la vida del proceso
+_AI_MODEL_CASCADE = getattr(config, "AI_MODEL_CASCADE", [])
+_PRIMARY_MODEL = _AI_MODEL_CASCADE[0] if _AI_MODEL_CASCADE else "gpt-4o"
+_PRIMARY_IS_MINI = "mini" in _PRIMARY_MODEL.lower() or "small" in _PRIMARY_MODEL.lower()
+# Etiquetas de los 4 días de pronóstico (zip con los datos diarios limita a 4)
+_DAY_LABELS = ("HOY", "MAÑANA", "PASADO MAÑANA", "DENTRO DE 3 DÍAS")
 _FINAL_DISCLAIMER = "⚠️ Este análisis es orientativo; la decisión final de volar es siempre responsabilidad del piloto al mando."
 
 
@@ -332,6 +344,25 @@ def _is_context_length_error(exc: Exception) -> bool:
     )
 
 
+def _iso_hhmm(iso: Optional[str], default: Optional[str]) -> Optional[str]:
+    """'HH:MM' de una marca ISO 'YYYY-MM-DDTHH:MM' sin trocearla; default si no trae hora."""
+    i = iso.find('T') if iso else -1
+    return iso[i + 1:i + 6] if i >= 0 else default
+
+
+# Mapeo comprimido de códigos WMO a categorías críticas para ULM (resto: despejado)
+_WX_CODE_CATEGORY = {
+    **dict.fromkeys((95, 96, 99), "⛈️ TORMENTA"),
+    **dict.fromkeys((80, 81, 82, 85, 86), "🌧️ CHUBASCOS"),
+    **dict.fromkeys((61, 63, 65), "🌧️ LLUVIA"),
+    **dict.fromkeys((51, 53, 55), "🌫️ LLOVIZNA"),
+    **dict.fromkeys((71, 73, 75, 77), "🌨️ NIEVE"),
+    **dict.fromkeys((45, 48), "🌫️ NIEBLA"),
+    **dict.fromkeys((2, 3), "☁️ NUBLADO"),
+    1: "🌥️ PARCIAL",
+}
+
+
 def _map_weather_code(code: Optional[int]) -> str:
     """
     Mapea código WMO a emoji + descripción compacta para IA.
@@ -344,26 +375,7 @@ def _map_weather_code(code: Optional[int]) -> str:
     """
     if code is None:
         return "⛅ VARIABLE"
-    
-    # Mapeo comprimido a categorías críticas para ULM
-    if code in (95, 96, 99):
-        return "⛈️ TORMENTA"
-    elif code in (80, 81, 82, 85, 86):
-        return "🌧️ CHUBASCOS"
-    elif code in (61, 63, 65):
-        return "🌧️ LLUVIA"
-    elif code in (51, 53, 55):
-        return "🌫️ LLOVIZNA"
-    elif code in (71, 73, 75, 77):
-        return "🌨️ NIEVE"
-    elif code in (45, 48):
-        return "🌫️ NIEBLA"
-    elif code in (2, 3):
-        return "☁️ NUBLADO"
-    elif code == 1:
-        return "🌥️ PARCIAL"
-    else:
-        return "⛅ DESPEJADO"
+    return _WX_CODE_CATEGORY.get(code, "⛅ DESPEJADO")
 
 
 def _compute_cloud_base_summary(hourly_data: Optional[list]) -> Dict:
@@ -393,7 +405,7 @@ def _compute_cloud_base_summary(hourly_data: Optional[list]) -> Dict:
     
     min_row = min(cloud_bases, key=lambda x: x['ft'])
     min_ft = int(min_row['ft'])
-    hour_str = min_row['time'].split('T')[1][:5] if 'T' in min_row['time'] else '??:??'
+    hour_str = _iso_hhmm(min_row['time'], '??:??')
     avg_ft = int(sum(c['ft'] for c in cloud_bases) / len(cloud_bases))
     
     # Clasificar riesgo
@@ -438,7 +450,7 @@ def _compute_visibility_summary(hourly_data: Optional[list]) -> Dict:
     
     min_row = min(visibilities, key=lambda x: x['km'])
     min_km = min_row['km']
-    hour_str = min_row['time'].split('T')[1][:5] if 'T' in min_row['time'] else '??:??'
+    hour_str = _iso_hhmm(min_row['time'], '??:??')
     avg_km = sum(v['km'] for v in visibilities) / len(visibilities)
     
     # Clasificar riesgo (límite legal ULM 5km)
@@ -692,21 +704,19 @@ def interpret_fused_forecast_with_ai(
     now_local = datetime.now(_MADRID_TZ)
     hora_actual = now_local.strftime("%H:%M")
     fecha_actual = now_local.strftime("%Y-%m-%d")
-    def _dfmt(d): return d.strftime("%d-%m-%Y") if hasattr(d, 'strftime') else datetime.strptime(d, "%Y-%m-%d").strftime("%d-%m-%Y")
+    def _dfmt(d): return (d if hasattr(d, 'strftime') else date.fromisoformat(d)).strftime("%d-%m-%Y")
 
     try:
         # ── Metadata diaria compacta (solo campos NO disponibles en el horario hora a hora) ──
         # Incluye: amanecer/atardecer, horas de sol, horas/mm de lluvia, CAPE máx,
         # freezing level mínimo, nieve y riesgo de niebla.
         # Las nubes, viento y visibilidad van en el horario hora a hora (más fiable).
-        labels = ["HOY", "MAÑANA", "PASADO MAÑANA", "DENTRO DE 3 DÍAS"]
         om_meta_lines = []
-        for idx, row in enumerate(daily[:4]):
-            label = labels[idx] if idx < len(labels) else f"DÍA +{idx}"
+        for label, row in zip(_DAY_LABELS, daily):  # como mucho 4 días
             sunrise_raw = row.get('sunrise', '')
             sunset_raw  = row.get('sunset', '')
-            sunrise_hm  = sunrise_raw.split('T')[1][:5] if sunrise_raw and 'T' in sunrise_raw else 'N/A'
-            sunset_hm   = sunset_raw.split('T')[1][:5]  if sunset_raw  and 'T' in sunset_raw  else 'N/A'
+            sunrise_hm  = _iso_hhmm(sunrise_raw, 'N/A')
+            sunset_hm   = _iso_hhmm(sunset_raw, 'N/A')
             sun_sec  = row.get('sunshine_duration')
             sun_str  = f" | ☀️{sun_sec/3600:.1f}h sol" if sun_sec is not None else ""
             precip_h  = row.get('precipitation_hours')
@@ -727,18 +737,19 @@ def interpret_fused_forecast_with_ai(
             snow_str = f" | nieve {snow}cm" if snow and snow > 0 else ""
             fog = row.get('fog_risk') or {}
             fog_level = fog.get('level')
-            fog_str = ""
+            fog_parts = []
             if fog_level in ('ALTO', 'MODERADO'):
                 op_hrs = fog.get('operational_hours', [])
-                fog_str = f" | 🌫️niebla:{fog_level}"
+                fog_parts.append(f" | 🌫️niebla:{fog_level}")
                 if op_hrs:
-                    fog_str += f"_op:{op_hrs[0]}"
-                    if len(op_hrs) > 1: fog_str += f"-{op_hrs[-1]}"
+                    fog_parts.append(f"_op:{op_hrs[0]}")
+                    if len(op_hrs) > 1: fog_parts.append(f"-{op_hrs[-1]}")
                 else:
                     fog_h = fog.get('peak_hour', '')
-                    if fog_h: fog_str += f"~{fog_h}"
+                    if fog_h: fog_parts.append(f"~{fog_h}")
                 spr = fog.get('min_spread')
-                if spr is not None: fog_str += f"(T-Td={spr}°C)"
+                if spr is not None: fog_parts.append(f"(T-Td={spr}°C)")
+            fog_str = "".join(fog_parts)
             om_meta_lines.append(
                 f"- {label}: ☀️{sunrise_hm}→{sunset_hm}{sun_str}{precip_str}{cape_str}{fl_str}{snow_str}{fog_str}"
             )
@@ -780,10 +791,11 @@ def interpret_fused_forecast_with_ai(
         weathercode_emoji = _map_weather_code(current.get('weather_code') if current else None)
         
         # Formato compacto del análisis convectivo
-        convection_analysis = f"⚠️ RIESGO CONVECTIVO: {convection_risk['risk_level']}"
+        convection_parts = [f"⚠️ RIESGO CONVECTIVO: {convection_risk['risk_level']}"]
         if convection_risk['indicators']:
-            convection_analysis += f"\n  • {' | '.join(convection_risk['indicators'][:3])}"  # Máximo 3 indicadores para ahorrar tokens
-        convection_analysis += f"\n  → {convection_risk['summary']}"
+            convection_parts.append(f"  • {' | '.join(convection_risk['indicators'][:3])}")  # Máximo 3 indicadores para ahorrar tokens
+        convection_parts.append(f"  → {convection_risk['summary']}")
+        convection_analysis = "\n".join(convection_parts)
         
         # Agregar resúmenes de techo, visibilidad y condición actual
         if cloud_base_summary['min_ft']:
@@ -820,14 +832,14 @@ def interpret_fused_forecast_with_ai(
         # HOY: desde hora actual. Días futuros: 09:00-cierre completo.
         # Cada fila: viento/rachas km/h, nube_baja (con tipo ICAO), nube_media si >30%,
         # visibilidad si <10km, precip_prob si >=20%, freezing_level si <3000m, wx emoji.
-        _is_summer  = now_local.month in range(4, 10)
-        _close_hour = 21 if _is_summer else 20
+        _close_hour = _CLOSE_HOUR_SUMMER if now_local.month in _SUMMER_MONTHS else _CLOSE_HOUR_WINTER
         _cur_hour   = now_local.hour
+        _today_start = max(_OPEN_HOUR, _cur_hour)  # HOY: primera hora a listar
 
         # Precomputar estado operativo en Python para evitar errores de aritmética del LLM
         _now_hm        = now_local.hour * 60 + now_local.minute
         _close_hm      = _close_hour * 60
-        _open_hm       = 9 * 60
+        _open_hm       = _OPEN_HOUR * 60
         _mins_to_close = _close_hm - _now_hm
         if _now_hm >= _close_hm:
             _op_status = f"🔒 YA CERRADO (cerró a las {_close_hour:02d}:00)"
@@ -849,12 +861,11 @@ def interpret_fused_forecast_with_ai(
             _op_status = f"✅ ABIERTO ({_mins_to_close // 60}h{_mins_to_close % 60:02d}min hasta las {_close_hour:02d}:00)"
             _s3_pista   = None  # LLM calcula la pista
             _aerodromo_abierto = True
-        _all_day_labels = {
-            fecha_actual:                                                       f"HOY ({_dfmt(now_local.date())})",
-            (now_local.date() + timedelta(days=1)).isoformat(): f"MAÑ ({_dfmt(now_local.date()+timedelta(days=1))})",
-            (now_local.date() + timedelta(days=2)).isoformat(): f"PAS ({_dfmt(now_local.date()+timedelta(days=2))})",
-            (now_local.date() + timedelta(days=3)).isoformat(): f"+3D ({_dfmt(now_local.date()+timedelta(days=3))})",
-        }
+        _today = now_local.date()
+        _all_day_labels = {}
+        for _offset, _prefix in enumerate(("HOY", "MAÑ", "PAS", "+3D")):
+            _d = _today + timedelta(days=_offset)
+            _all_day_labels[_d.isoformat()] = f"{_prefix} ({_dfmt(_d)})"
         # ── Open-Meteo: tabla de datos en bruto (viento pre-convertido a kt) ─────
         def _fmt(v, decimals=0):
             return f"{v:.{decimals}f}" if v is not None else "-"
@@ -870,7 +881,7 @@ def interpret_fused_forecast_with_ai(
             if _day not in _all_day_labels:
                 continue
             _hh = int(_t[11:13]) if len(_t) >= 13 else -1
-            _start = max(9, _cur_hour) if _day == fecha_actual else 9
+            _start = _today_start if _day == fecha_actual else _OPEN_HOUR
             if _hh < _start or _hh > _close_hour:
                 continue
             if _h.get('is_day') != 1:
@@ -905,7 +916,7 @@ def interpret_fused_forecast_with_ai(
             if _wday not in _windy_day_labels:
                 continue
             _whh = int(_wt[11:13]) if len(_wt) >= 13 else -1
-            _wstart = max(9, _cur_hour) if _wday == fecha_actual else 9
+            _wstart = _today_start if _wday == fecha_actual else _OPEN_HOUR
             if _whh < _wstart or _whh > _close_hour:
                 continue
             if _wday != _prev_wday:
@@ -1043,9 +1054,8 @@ Reglas CRÍTICAS:
         # Detectar si vamos a usar un modelo con límites bajos
         # GitHub Models: 60k tokens/min (muy restrictivo con mapas)
         # mini/small: bajo límite de tokens
-        model_cascade = getattr(config, "AI_MODEL_CASCADE", [])
-        primary_model = model_cascade[0] if model_cascade else "gpt-4o"
-        is_mini_model = "mini" in primary_model.lower() or "small" in primary_model.lower()
+        primary_model = _PRIMARY_MODEL
+        is_mini_model = _PRIMARY_IS_MINI
         is_github_provider = provider.lower() == "github"
 
         # Excluir imágenes si: es mini, está bloqueado, O es GitHub Models
@@ -1123,9 +1133,7 @@ Reglas CRÍTICAS:
         # Pronóstico 4 días
         if daily:
             fallback_sections.append("**PRONÓSTICO 4 DÍAS (Open-Meteo):**")
-            labels = ["HOY", "MAÑANA", "PASADO MAÑANA", "DENTRO DE 3 DÍAS"]
-            for i, day in enumerate(daily[:4]):
-                label = labels[i] if i < len(labels) else f"DÍA +{i}"
+            for label, day in zip(_DAY_LABELS, daily):
                 sunrise = day.get('sunrise', 'N/A')
                 sunset = day.get('sunset', 'N/A')
                 _raw_date = day.get('date', 'N/A')
@@ -1134,8 +1142,8 @@ Reglas CRÍTICAS:
                 fallback_sections.append(f"  🌡️ Temp: {day.get('temp_min', 'N/A')}°C - {day.get('temp_max', 'N/A')}°C")
                 fallback_sections.append(f"  💨 Viento max: {day.get('wind_max', 'N/A')} km/h")
                 fallback_sections.append(f"  🌬️ Rachas max: {day.get('wind_gusts_max', 'N/A')} km/h")
-                fallback_sections.append(f"  ☀️ Amanecer: {sunrise.split('T')[1][:5] if 'T' in sunrise else sunrise}")
-                fallback_sections.append(f"  🌅 Atardecer: {sunset.split('T')[1][:5] if 'T' in sunset else sunset}")
+                fallback_sections.append(f"  ☀️ Amanecer: {_iso_hhmm(sunrise, sunrise)}")
+                fallback_sections.append(f"  🌅 Atardecer: {_iso_hhmm(sunset, sunset)}")
         
         # Windy
         if windy_daily:
@@ -12,6 +12,9 @@ load_dotenv(_ENV_PATH, override=True)
 # Configuración Web
 WEB_HOST = os.getenv('WEB_HOST', '127.0.0.1')
 WEB_PORT = int(os.getenv('WEB_PORT', '8000'))
+# Almacén de contadores de rate limiting. 'memory://' vale con un solo proceso;
+# con varios workers usar uno compartido (p. ej. redis://localhost:6379/0, requiere 'redis')
+RATELIMIT_STORAGE_URI = os.getenv('RATELIMIT_STORAGE_URI', 'memory://')
 
 # Configuración de IA
 AI_PROVIDER = os.getenv('AI_PROVIDER', 'github')  # 'github' o 'openai'
@@ -512,7 +512,7 @@ echo "  🌐 Tipo: $([ "$INSTALL_TYPE" = "subdomain" ] && echo "Subdominio" || e
 echo "  🔗 URL: http://$SITE_NAME$PATH_PREFIX"
 echo "  🔌 Puerto interno: $SERVICE_PORT"
 echo "  ⚙️  Servicio: lemr-meteo (Gunicorn)"
-echo "  🚀 Servidor: Gunicorn con 2 workers"
+echo "  🚀 Servidor: Gunicorn (1 worker, 8 hilos)"
 
 if [ -d "$BACKUP_DIR" ]; then
     echo "  💾 Backups: $BACKUP_DIR"
@@ -0,0 +1,24 @@
+"""
+Configuración de Gunicorn (hooks)
+
+Asigna a cada worker un WORKER_ID estable (0, 1, ...): web_app solo lanza el hilo de
+precalentamiento de la caché en el WORKER_ID=0. Si un worker muere, su reemplazo
+hereda el hueco libre, así que siempre hay exactamente un worker precalentando.
+
+    gunicorn --config gunicorn.conf.py ... wsgi:app
+"""
+import os
+
+
+def pre_fork(server, worker):
+    """(Proceso maestro) Reserva el menor WORKER_ID libre entre los workers vivos."""
+    taken = {getattr(w, "lemr_worker_id", None) for w in server.WORKERS.values()}
+    worker_id = 0
+    while worker_id in taken:
+        worker_id += 1
+    worker.lemr_worker_id = worker_id
+
+
+def post_fork(server, worker):
+    """(Worker) Expone el hueco reservado antes de que se importe la app."""
+    os.environ["WORKER_ID"] = str(worker.lemr_worker_id)
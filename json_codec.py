@@ -0,0 +1,24 @@
+"""
+Codificación/decodificación JSON rápida para las respuestas de las APIs meteorológicas.
+Usa orjson si está instalado y recurre al módulo json estándar si no.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional
+    orjson = None
+
+
+def loads(data: bytes | str):
+    """Decodifica JSON (bytes UTF-8 o str) con orjson si está disponible."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj) -> bytes:
+    """Codifica a JSON compacto en bytes UTF-8 con orjson si está disponible."""
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
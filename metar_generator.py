@@ -4,9 +4,10 @@ Basado en especificaciones ICAO Annex 3.
 """
 import math
 from datetime import datetime
-from zoneinfo import ZoneInfo
 from typing import Optional, Dict
 
+from timezones import UTC_TZ
+
 
 def calculate_dewpoint(temperature_c: float, humidity_percent: float) -> float:
     """
@@ -177,13 +178,13 @@ def generate_metar_lemr(
         if time_str:
             try:
                 dt = datetime.fromisoformat(time_str.replace('Z', '+00:00'))
-                dt_utc = dt.astimezone(ZoneInfo("UTC"))
+                dt_utc = dt.astimezone(UTC_TZ)
                 day_hour = dt_utc.strftime("%d%H%M")
             except:
-                dt_utc = datetime.now(ZoneInfo("UTC"))
+                dt_utc = datetime.now(UTC_TZ)
                 day_hour = dt_utc.strftime("%d%H%M")
         else:
-            dt_utc = datetime.now(ZoneInfo("UTC"))
+            dt_utc = datetime.now(UTC_TZ)
             day_hour = dt_utc.strftime("%d%H%M")
         
         # Viento
@@ -103,6 +103,21 @@ def parse_metar_components(metar: str) -> Dict[str, str]:
     return components
 
 
+_REPORT_TYPE_PREFIXES = ("METAR ", "SPECI ")
+
+
+def _has_metar_header(metar: str) -> bool:
+    """
+    Comprobación barata de formato antes de lanzar ninguna regex:
+    [METAR|SPECI [COR]] ICAO DDHHMMZ ...
+    """
+    if metar.startswith(_REPORT_TYPE_PREFIXES):
+        metar = metar[6:]
+        if metar.startswith("COR "):
+            metar = metar[4:]
+    return len(metar) >= 12 and metar[4] == ' ' and metar[11] == 'Z'
+
+
 def classify_flight_category(metar: str) -> Dict[str, str]:
     """
     Clasifica las condiciones de vuelo según el METAR en categorías LIFR/IFR/MVFR/VFR.
@@ -121,7 +136,7 @@ def classify_flight_category(metar: str) -> Dict[str, str]:
         'description': 'No se pudo clasificar'
     }
     
-    if not metar or len(metar) < 10:
+    if not metar or not _has_metar_header(metar):
         return result
     
     # Extraer visibilidad en metros
@@ -13,36 +13,42 @@ import json
 import os
 import time
 import traceback
+from collections import OrderedDict
 from datetime import datetime
-from threading import Lock
+from threading import Lock, Timer
 from typing import Optional
-from zoneinfo import ZoneInfo
 
 import requests as _requests
 
-_MADRID_TZ = ZoneInfo("Europe/Madrid")
+from timezones import MADRID_TZ as _MADRID_TZ
 
 # Anti-spam persistente: timestamps guardados en disco para sobrevivir reinicios
 _ANTISPAM_FILE = "/tmp/lemr_tg_antispam.json"
 _antispam_lock = Lock()
 _MIN_INTERVAL = 1800  # 30 minutos entre alertas de la misma fuente (por defecto)
+_MAX_SOURCES = 256  # Máximo de fuentes recordadas (LRU): evita crecimiento ilimitado del archivo
 # Intervalos específicos por fuente (sobrescriben _MIN_INTERVAL si están definidos)
 _SOURCE_INTERVALS: dict[str, int] = {
     "aemet_maps": 7200,  # 2 horas — mapa de análisis cae con frecuencia
 }
 
+# Reintento tras HTTP 429 de Telegram: como máximo 1 reintento pendiente por fuente
+_MAX_RETRY_AFTER = 60  # segundos; si Telegram pide esperar más, se descarta la alerta
+_pending_retries: set[str] = set()
+_retry_lock = Lock()
 
-def _read_antispam() -> dict[str, float]:
-    """Lee los timestamps de anti-spam desde el archivo en disco."""
+
+def _read_antispam() -> "OrderedDict[str, float]":
+    """Lee los timestamps de anti-spam desde el archivo en disco (orden LRU: más antiguo primero)."""
     try:
         with open(_ANTISPAM_FILE, "r", encoding="utf-8") as f:
             data = json.load(f)
-            return {k: float(v) for k, v in data.items()}
+            return OrderedDict((k, float(v)) for k, v in data.items())
     except Exception:
-        return {}
+        return OrderedDict()
 
 
-def _write_antispam(timestamps: dict[str, float]) -> None:
+def _write_antispam(timestamps: "OrderedDict[str, float]") -> None:
     """Persiste los timestamps de anti-spam en disco."""
     try:
         with open(_ANTISPAM_FILE, "w", encoding="utf-8") as f:
@@ -81,15 +87,21 @@ def send_alert(
         # No configurado, silencio total
         return False
 
-    # Anti-spam persistente (thread-safe + supervive reinicios)
+    # Anti-spam persistente (thread-safe + supervive reinicios).
+    # Se usa reloj de pared porque time.monotonic() no es comparable entre procesos;
+    # si el reloj retrocede (ajuste NTP) el intervalo negativo no suprime la alerta.
     interval = _SOURCE_INTERVALS.get(source, _MIN_INTERVAL)
     now = time.time()
     with _antispam_lock:
         timestamps = _read_antispam()
-        if now - timestamps.get(source, 0) < interval:
+        elapsed = now - timestamps.get(source, 0.0)
+        if 0 <= elapsed < interval:
             print(f"📵 Telegram: alerta suprimida por anti-spam (fuente={source}, intervalo={interval}s)")
             return False
         timestamps[source] = now
+        timestamps.move_to_end(source)
+        while len(timestamps) > _MAX_SOURCES:
+            timestamps.popitem(last=False)
         _write_antispam(timestamps)
 
     # Construir texto
@@ -108,28 +120,70 @@ def send_alert(
         lines += ["", f"```\n{tb_short[:500]}\n```"]
 
     text = "\n".join(lines)
+    url = f"https://api.telegram.org/bot{token}/sendMessage"
+    payload = {
+        "chat_id": chat_id,
+        "text": text,
+        "parse_mode": "MarkdownV2",
+    }
 
     try:
-        resp = _requests.post(
-            f"https://api.telegram.org/bot{token}/sendMessage",
-            json={
-                "chat_id": chat_id,
-                "text": text,
-                "parse_mode": "MarkdownV2",
-            },
-            timeout=10,
-        )
+        resp = _requests.post(url, json=payload, timeout=10)
         if resp.status_code == 200:
             print(f"📱 Telegram: alerta enviada (fuente={source})")
             return True
-        else:
-            print(f"⚠️ Telegram HTTP {resp.status_code}: {resp.text[:120]}")
+        if resp.status_code == 429:
+            _schedule_retry(url, payload, source, _retry_after_seconds(resp))
             return False
+        print(f"⚠️ Telegram HTTP {resp.status_code}: {resp.text[:120]}")
+        return False
     except Exception as send_exc:
         print(f"⚠️ Telegram send_alert falló: {send_exc}")
         return False
 
 
+def _retry_after_seconds(resp) -> int:
+    """Extrae parameters.retry_after de una respuesta 429 de Telegram (1s por defecto)."""
+    try:
+        return int(resp.json().get("parameters", {}).get("retry_after", 1))
+    except Exception:
+        return 1
+
+
+def _schedule_retry(url: str, payload: dict, source: str, wait: int) -> bool:
+    """
+    Programa un único reintento en background respetando retry_after.
+    No encola nada si ya hay un reintento pendiente para la fuente o si la espera es excesiva.
+    """
+    if wait > _MAX_RETRY_AFTER:
+        print(f"⚠️ Telegram 429: retry_after={wait}s excesivo, alerta descartada (fuente={source})")
+        return False
+    with _retry_lock:
+        if source in _pending_retries:
+            print(f"⚠️ Telegram 429: ya hay un reintento pendiente (fuente={source})")
+            return False
+        _pending_retries.add(source)
+
+    def _retry():
+        try:
+            resp = _requests.post(url, json=payload, timeout=10)
+            if resp.status_code == 200:
+                print(f"📱 Telegram: alerta enviada tras reintento (fuente={source})")
+            else:
+                print(f"⚠️ Telegram HTTP {resp.status_code} en reintento: {resp.text[:120]}")
+        except Exception as retry_exc:
+            print(f"⚠️ Telegram reintento falló: {retry_exc}")
+        finally:
+            with _retry_lock:
+                _pending_retries.discard(source)
+
+    print(f"⏳ Telegram 429: reintentando en {wait}s (fuente={source})")
+    timer = Timer(wait, _retry)
+    timer.daemon = True
+    timer.start()
+    return True
+
+
 def _escape_md(text: str) -> str:
     """Escapa caracteres reservados de MarkdownV2."""
     reserved = r"\_*[]()~`>#+-=|{}.!"
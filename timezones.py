@@ -0,0 +1,7 @@
+"""
+Zonas horarias compartidas por todos los módulos de LEMR-Meteo.
+"""
+from zoneinfo import ZoneInfo
+
+MADRID_TZ = ZoneInfo("Europe/Madrid")
+UTC_TZ = ZoneInfo("UTC")
@@ -2,22 +2,119 @@
 Módulo para obtener datos meteorológicos de ubicaciones sin servicio METAR
 """
 import requests
+import time
+from bisect import bisect_left, bisect_right
+from requests.adapters import HTTPAdapter
 from threading import Lock
+from types import MappingProxyType
 from typing import Optional, Dict
 from datetime import datetime, timedelta
+from urllib3.util.retry import Retry
 import config
-
-# Micro-caché para deduplicar llamadas concurrentes a Open-Meteo (TTL 2 min)
-_WF_CACHE: dict = {"data": None, "expires_at": None, "key": None}
+import json_codec
+
+# Sesión HTTP compartida: keep-alive + pool de conexiones (evita un handshake TLS por petición).
+# Hasta 2 reintentos ante timeout, error de red o 5xx con espera creciente (0s, 10s).
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=8,
+    max_retries=Retry(
+        total=2,
+        backoff_factor=5,
+        status_forcelist=(500, 502, 503, 504),
+        raise_on_status=False,
+    ),
+))
+
+# Caché de Open-Meteo por ubicación (lat, lon redondeadas) → (expira_epoch, resultado).
+# Open-Meteo actualiza las condiciones "current" cada 15 min, así que la entrada
+# caduca en el siguiente cuarto de hora (:00/:15/:30/:45) y no antes.
+_WF_CACHE: dict[tuple, tuple[float, dict]] = {}
 _WF_CACHE_LOCK = Lock()
-_WF_CACHE_TTL = 120  # segundos
+_WF_CACHE_PERIOD = 15 * 60  # segundos
+
+
+def _next_quarter_hour_epoch(now: float) -> float:
+    """Devuelve el epoch del próximo cuarto de hora (válido también en Europe/Madrid)."""
+    return (now // _WF_CACHE_PERIOD + 1) * _WF_CACHE_PERIOD
 
 
-def _compute_fog_risk(date_str: str, hourly_forecast: list) -> dict:
+def _split_times(hourly_forecast: list) -> list:
     """
-    Evalúa el riesgo de niebla matinal para una fecha dada.
-    Analiza desde las 22:00 de la noche previa hasta las 13:00 del día,
-    cubriendo tanto la formación nocturna como la persistencia en horario operativo.
+    Descompone una sola vez el 'time' ISO de cada hora en (fecha, hora, 'HH:MM')
+    para que niebla y Phase 4 no vuelvan a trocear la misma cadena en cada día.
+    La hora es None si el timestamp no tiene formato 'YYYY-MM-DDTHH:MM'.
+    """
+    time_keys = []
+    for h in hourly_forecast:
+        t = h.get('time') or ''
+        time_keys.append((t[:10], int(t[11:13]) if len(t) >= 13 else None, t[11:16]))
+    return time_keys
+
+
+# Códigos WMO de niebla (45 niebla, 48 niebla con escarcha)
+_FOG_WX_CODES = frozenset((45, 48))
+
+
+def _score_fog_hour(h: dict, hhmm: str) -> Optional[dict]:
+    """Devuelve la entrada de riesgo de niebla de una hora, o None si no hay riesgo."""
+    temp = h.get('temperature')
+    dp   = h.get('dewpoint')
+    wind = h.get('wind_speed')
+    pp   = h.get('precipitation_prob')
+    wx   = h.get('weather_code')
+    # Campos ausentes (None) cuentan como 0; un 0.0 real se conserva tal cual
+    if wind is None:
+        wind = 0
+    if pp is None:
+        pp = 0
+    if wx is None:
+        wx = 0
+    vis  = h.get('visibility')  # ya en km
+
+    if pp > 30:
+        return None  # lluvia activa inhibe niebla de radiación
+
+    # Niebla confirmada por el modelo WMO
+    if wx in _FOG_WX_CODES:
+        return {'time': hhmm, 'spread': 0.0,
+                'wind': round(wind, 1), 'score': 5, 'confirmed': True}
+
+    if temp is None or dp is None:
+        return None
+
+    spread = temp - dp
+    score  = 0
+
+    if spread <= 2:
+        score += 2
+    elif spread <= 3:
+        score += 1
+    else:
+        return None  # spread > 3°C → sin riesgo
+
+    if wind <= 5:
+        score += 2
+    elif wind <= 10:
+        score += 1
+
+    if vis is not None:
+        if vis < 1:
+            score += 2
+        elif vis < 5:
+            score += 1
+
+    if score < 2:
+        return None
+    return {'time': hhmm, 'spread': round(spread, 1),
+            'wind': round(wind, 1), 'score': score, 'confirmed': False}
+
+
+def _score_fog_hours(hourly_forecast: list, time_keys: list) -> list:
+    """
+    Puntúa el riesgo de niebla de cada hora una sola vez; el resultado se
+    comparte entre los 4 días en lugar de re-evaluar el horario completo por día.
 
     Criterios (niebla de radiación / advectiva, típica en La Morgal):
       - Spread T−Td ≤ 3°C  (condición necesaria; ≤2°C = riesgo alto)
@@ -25,76 +122,72 @@ def _compute_fog_risk(date_str: str, hourly_forecast: list) -> dict:
       - Sin precipitación activa (pp < 30%)
       - Visibilidad < 5 km     (refuerza, <1 km = confirmación)
       - WX code 45/48          (niebla detectada directamente por el modelo)
-    """
-    target_dt = datetime.fromisoformat(date_str)
-    prev_date = (target_dt - timedelta(days=1)).strftime('%Y-%m-%d')
 
-    fog_hours = [
-        h for h in hourly_forecast
-        if len(h.get('time', '')) >= 13
-        and (
-            (h['time'][:10] == prev_date and int(h['time'][11:13]) >= 22)
-            or (h['time'][:10] == date_str and int(h['time'][11:13]) <= 13)
-        )
-    ]
-
-    if not fog_hours:
-        return {'level': None}
+    Args:
+        hourly_forecast: Filas horarias de get_weather_forecast()
+        time_keys: Salida de _split_times() para esas mismas filas
 
-    risky = []
-    for h in fog_hours:
-        temp = h.get('temperature')
-        dp   = h.get('dewpoint')
-        wind = h.get('wind_speed') or 0
-        pp   = h.get('precipitation_prob') or 0
-        wx   = h.get('weather_code') or 0
-        vis  = h.get('visibility')  # ya en km
-
-        if pp > 30:
-            continue  # lluvia activa inhibe niebla de radiación
-
-        # Niebla confirmada por el modelo WMO
-        if wx in (45, 48):
-            risky.append({'time': h['time'][11:16], 'spread': 0.0,
-                          'wind': round(wind, 1), 'score': 5, 'confirmed': True})
+    Returns:
+        Lista de tuplas (fecha 'YYYY-MM-DD', hora, entrada de riesgo o None)
+    """
+    scored = []
+    for h, (day, hour, hhmm) in zip(hourly_forecast, time_keys):
+        if hour is None:
             continue
+        scored.append((day, hour, _score_fog_hour(h, hhmm)))
+    return scored
 
-        if temp is None or dp is None:
-            continue
 
-        spread = temp - dp
-        score  = 0
+def _day_hour(scored: tuple) -> tuple:
+    """Clave (fecha, hora) de una tupla de _score_fog_hours()."""
+    return scored[0], scored[1]
 
-        if spread <= 2:
-            score += 2
-        elif spread <= 3:
-            score += 1
-        else:
-            continue  # spread > 3°C → sin riesgo
 
-        if wind <= 5:
-            score += 2
-        elif wind <= 10:
-            score += 1
+def _compute_fog_risk(date_str: str, scored_hours: list) -> dict:
+    """
+    Evalúa el riesgo de niebla matinal para una fecha dada.
+    Analiza desde las 22:00 de la noche previa hasta las 13:00 del día,
+    cubriendo tanto la formación nocturna como la persistencia en horario operativo.
 
-        if vis is not None:
-            if vis < 1:
-                score += 2
-            elif vis < 5:
-                score += 1
+    Args:
+        date_str: Fecha 'YYYY-MM-DD'
+        scored_hours: Salida de _score_fog_hours() para todo el horario
+    """
+    target_dt = datetime.fromisoformat(date_str)
+    prev_date = (target_dt - timedelta(days=1)).strftime('%Y-%m-%d')
 
-        if score >= 2:
-            risky.append({'time': h['time'][11:16], 'spread': round(spread, 1),
-                          'wind': round(wind, 1), 'score': score, 'confirmed': False})
+    # scored_hours sigue el orden cronológico de la API: la ventana es un tramo contiguo
+    start = bisect_left(scored_hours, (prev_date, 22), key=_day_hour)
+    end = bisect_right(scored_hours, (date_str, 13), key=_day_hour)
+    fog_window = [entry for _, _, entry in scored_hours[start:end]]
 
-    if not risky:
-        return {'level': 'BAJO'}
+    if not fog_window:
+        return {'level': None}
 
-    max_score = max(r['score'] for r in risky)
-    confirmed = any(r.get('confirmed') for r in risky)
-    best      = max(risky, key=lambda r: r['score'])
-    spreads   = [r['spread'] for r in risky if not r.get('confirmed')]
+    # Una sola pasada: score máximo, hora pico, confirmación, spreads y horas operativas
+    best = None
+    confirmed = False
+    n_risky = 0
+    spreads = []
+    operational_hours = set()
+    for r in fog_window:
+        if r is None:
+            continue
+        n_risky += 1
+        if best is None or r['score'] > best['score']:
+            best = r
+        if r.get('confirmed'):
+            confirmed = True
+        else:
+            spreads.append(r['spread'])
+        # Horas con riesgo dentro del horario operativo (09:00-13:00)
+        if '09:00' <= r['time'] <= '13:00':
+            operational_hours.add(r['time'])
+
+    if best is None:
+        return {'level': 'BAJO'}
 
+    max_score = best['score']
     if confirmed or max_score >= 4:
         level = 'ALTO'
     elif max_score >= 3:
@@ -106,15 +199,169 @@ def _compute_fog_risk(date_str: str, hourly_forecast: list) -> dict:
         'level': level,
         'peak_hour': best['time'],
         'min_spread': min(spreads) if spreads else None,
-        'n_hours': len(risky),
-        # Horas con riesgo dentro del horario operativo (09:00-13:00)
-        'operational_hours': sorted({
-            r['time'] for r in risky
-            if r['time'] >= '09:00' and r['time'] <= '13:00'
-        }),
+        'n_hours': n_risky,
+        'operational_hours': sorted(operational_hours),
     }
 
 
+# Campo horario en hourly_forecast → variable de la API Open-Meteo (mismo orden que la petición)
+_HOURLY_FIELDS = (
+    ('temperature', 'temperature_2m'),
+    ('dewpoint', 'dewpoint_2m'),
+    ('precipitation_prob', 'precipitation_probability'),
+    ('weather_code', 'weather_code'),
+    ('cloud_cover', 'cloud_cover'),
+    ('cloud_cover_low', 'cloud_cover_low'),
+    ('cloud_cover_mid', 'cloud_cover_mid'),
+    ('cloud_cover_high', 'cloud_cover_high'),
+    ('visibility', 'visibility'),  # en km tras la conversión
+    ('wind_speed', 'wind_speed_10m'),
+    ('wind_direction', 'wind_direction_10m'),
+    ('wind_gusts', 'wind_gusts_10m'),
+    ('freezing_level_height', 'freezing_level_height'),
+    ('snow_depth', 'snow_depth'),
+    ('is_day', 'is_day'),  # 1 = dia, 0 = noche
+)
+_HOURLY_KEYS = tuple(key for key, _ in _HOURLY_FIELDS)
+_HOURLY_ROW_KEYS = ('time',) + _HOURLY_KEYS
+
+
+# Campo diario en daily_forecast → variable de la API Open-Meteo (mismo orden que la petición)
+_DAILY_FIELDS = (
+    ('temp_max', 'temperature_2m_max'),
+    ('temp_min', 'temperature_2m_min'),
+    ('dewpoint_max', 'dewpoint_2m_max'),
+    ('dewpoint_min', 'dewpoint_2m_min'),
+    ('sunrise', 'sunrise'),
+    ('sunset', 'sunset'),
+    ('precipitation', 'precipitation_sum'),
+    ('precipitation_hours', 'precipitation_hours'),
+    ('wind_max', 'wind_speed_10m_max'),
+    ('wind_gusts_max', 'wind_gusts_10m_max'),
+    ('wind_direction_dominant', 'wind_direction_10m_dominant'),
+    ('weather_code', 'weather_code'),
+    ('cape_max', 'cape_max'),
+    ('precipitation_prob_max', 'precipitation_probability_max'),
+    ('sunshine_duration', 'sunshine_duration'),
+)
+_DAILY_ROW_KEYS = ('date',) + tuple(key for key, _ in _DAILY_FIELDS)
+
+
+def _column(block: dict, api_key: str, n: int) -> list:
+    """Columna de Open-Meteo con longitud n (None si la API no la devolvió)."""
+    values = block.get(api_key) or []
+    if len(values) < n:
+        return list(values) + [None] * (n - len(values))
+    return values
+
+
+# Ventanas horarias (hora local, inclusivas) del patrón temporal mañana/tarde
+_PHASE4_PERIODS = (('man', 9, 13), ('tard', 14, 21))
+# Campo horario → sufijo de clave en el resumen por período
+_PHASE4_PERIOD_FIELDS = (
+    ('wind_gusts', 'gust'),
+    ('wind_speed', 'wind'),
+    ('cloud_cover_low', 'cloud_low'),
+    ('cloud_cover_mid', 'cloud_mid'),
+    ('cloud_cover_high', 'cloud_high'),
+    ('precipitation_prob', 'precip_prob'),
+)
+# Capa de nubes (clave en el resumen) → campo horario
+_PHASE4_CLOUD_FIELDS = (
+    ('cloud_low', 'cloud_cover_low'),
+    ('cloud_mid', 'cloud_cover_mid'),
+    ('cloud_high', 'cloud_cover_high'),
+)
+# Por período: (período, hora ini, hora fin, ((campo, clave en maxima), ...), clave de turbulencia)
+_PHASE4_PERIOD_KEYS = tuple(
+    (period_key, h_min, h_max,
+     tuple((field, f'{prefix}_{period_key}') for field, prefix in _PHASE4_PERIOD_FIELDS),
+     f'turb_{period_key}')
+    for period_key, h_min, h_max in _PHASE4_PERIODS
+)
+
+
+def _phase4_summary(day_rows: list) -> dict:
+    """
+    Calcula resumen de parámetros Phase 4 para una lista de horas diurnas.
+    Recorre las horas una sola vez acumulando máximos/mínimos por campo y período.
+
+    Args:
+        day_rows: Tuplas (hora, 'HH:MM', fila horaria) de un mismo día
+    """
+    maxima: dict = {}
+
+    def _keep_max(key: str, value) -> None:
+        if value is not None:
+            prev = maxima.get(key)
+            if prev is None or value > prev:
+                maxima[key] = value
+
+    min_fl = min_fl_t = None
+    peak_gust = peak_gust_t = None
+    for hour, hhmm, h in day_rows:
+        wind_kmh = h.get('wind_speed')
+        gust_kmh = h.get('wind_gusts')
+        turb_kt = (gust_kmh - wind_kmh) / 1.852 if wind_kmh is not None and gust_kmh is not None else None
+
+        fl = h.get('freezing_level_height')
+        if fl is not None and (min_fl is None or fl < min_fl):
+            min_fl, min_fl_t = fl, hhmm
+        if gust_kmh is not None and (peak_gust is None or gust_kmh > peak_gust):
+            peak_gust, peak_gust_t = gust_kmh, hhmm
+
+        _keep_max('turb', turb_kt)
+        _keep_max('snow', h.get('snow_depth'))
+        for layer, field in _PHASE4_CLOUD_FIELDS:
+            _keep_max(layer, h.get(field))
+
+        if hour is None:
+            continue
+        for _, h_min, h_max, field_keys, turb_key in _PHASE4_PERIOD_KEYS:
+            if h_min <= hour <= h_max:
+                for field, key in field_keys:
+                    _keep_max(key, h.get(field))
+                _keep_max(turb_key, turb_kt)
+                break
+
+    result = {}
+
+    # 1️⃣ Freezing level mínimo del día (metros y pies)
+    if min_fl is not None:
+        result['freezing_level_min_m'] = round(min_fl)
+        result['freezing_level_min_ft'] = round(min_fl * 3.28084)
+        result['freezing_level_min_time'] = min_fl_t  # 'HH:MM'
+
+    # 2️⃣ Turbulencia mecánica: máx diferencia racha-viento (kt) del día
+    if 'turb' in maxima:
+        result['turb_diff_max_kt'] = round(maxima['turb'], 1)
+
+    # 5️⃣ Nieve máxima del día (m → cm)
+    if 'snow' in maxima:
+        result['snow_max_cm'] = round(maxima['snow'] * 100, 1)
+
+    # 6️⃣ Nubes por capa: cobertura máxima del día
+    for layer, _ in _PHASE4_CLOUD_FIELDS:
+        if layer in maxima:
+            result[f'{layer}_max'] = round(maxima[layer])
+
+    # 7️⃣ Patrón temporal mañana (09-13h) vs tarde (14-21h)
+    # Permite detectar si el día empeora/mejora a lo largo de la jornada
+    for period_key, _, _, field_keys, turb_key in _PHASE4_PERIOD_KEYS:
+        for _, key in field_keys:
+            if key in maxima:
+                result[f'{key}_max'] = round(maxima[key])
+        # turbulencia mecánica por período (diff racha-viento en kt)
+        if turb_key in maxima:
+            result[f'turb_diff_{period_key}_max'] = round(maxima[turb_key], 1)
+
+    # Hora del pico de rachas (útil para planificar franja horaria)
+    if peak_gust_t is not None:
+        result['peak_gust_hour'] = peak_gust_t
+
+    return result
+
+
 def get_weather_forecast(lat: float, lon: float, location_name: str = "") -> Optional[Dict]:
     """
     Obtiene el pronóstico meteorológico para una ubicación dada
@@ -130,14 +377,9 @@ def get_weather_forecast(lat: float, lon: float, location_name: str = "") -> Opt
     """
     _cache_key = (round(lat, 4), round(lon, 4))
     with _WF_CACHE_LOCK:
-        _now = datetime.utcnow()
-        if (
-            _WF_CACHE["key"] == _cache_key
-            and _WF_CACHE["data"] is not None
-            and _WF_CACHE["expires_at"] is not None
-            and _now < _WF_CACHE["expires_at"]
-        ):
-            return _WF_CACHE["data"]
+        cached = _WF_CACHE.get(_cache_key)
+        if cached is not None and time.time() < cached[0]:
+            return cached[1]
     try:
         # Parámetros para la API de Open-Meteo
         params = {
@@ -156,66 +398,17 @@ def get_weather_forecast(lat: float, lon: float, location_name: str = "") -> Opt
                 'wind_gusts_10m',
                 'cape'
             ],
-            'hourly': [
-                'temperature_2m',
-                'dewpoint_2m',
-                'precipitation_probability',
-                'weather_code',
-                'cloud_cover',
-                'cloud_cover_low',
-                'cloud_cover_mid',
-                'cloud_cover_high',
-                'visibility',
-                'wind_speed_10m',
-                'wind_direction_10m',
-                'wind_gusts_10m',
-                'freezing_level_height',
-                'snow_depth',
-                'is_day'
-            ],
-            'daily': [
-                'temperature_2m_max',
-                'temperature_2m_min',
-                'dewpoint_2m_max',
-                'dewpoint_2m_min',
-                'sunrise',
-                'sunset',
-                'precipitation_sum',
-                'precipitation_hours',
-                'wind_speed_10m_max',
-                'wind_gusts_10m_max',
-                'wind_direction_10m_dominant',
-                'weather_code',
-                'cape_max',
-                'precipitation_probability_max',
-                'sunshine_duration'
-            ],
+            'hourly': [api_key for _, api_key in _HOURLY_FIELDS],
+            'daily': [api_key for _, api_key in _DAILY_FIELDS],
             'timezone': 'Europe/Madrid',
             'forecast_days': 4  # Hoy + 3 días siguientes
         }
         
-        # Hasta 3 intentos con espera entre ellos (timeout, error de red o 5xx)
-        import time as _time
-        last_exc = None
-        response = None
-        for _attempt in range(3):
-            try:
-                response = requests.get(config.OPEN_METEO_API, params=params, timeout=25)
-                if response.status_code < 500:
-                    response.raise_for_status()
-                    break
-                # 5xx → reintentable
-                print(f"⏱️ Open-Meteo HTTP {response.status_code} (intento {_attempt + 1}/3), reintentando...")
-                last_exc = RuntimeError(f"Open-Meteo HTTP {response.status_code}")
-            except requests.exceptions.RequestException as _e:
-                last_exc = _e
-                print(f"⏱️ Open-Meteo error (intento {_attempt + 1}/3): {_e}, reintentando...")
-            if _attempt < 2:
-                _time.sleep(5 * (_attempt + 1))  # 5s, 10s
-        if response is None or not response.ok:
-            raise last_exc or RuntimeError("Open-Meteo no respondió")
+        # Reintentos (timeout, error de red o 5xx) gestionados por el HTTPAdapter de _SESSION
+        response = _SESSION.get(config.OPEN_METEO_API, params=params, timeout=(5, 25))
+        response.raise_for_status()
         
-        data = response.json()
+        data = json_codec.loads(response.content)
         
         # Formatear datos actuales
         current = data.get('current', {})
@@ -240,137 +433,40 @@ def get_weather_forecast(lat: float, lon: float, location_name: str = "") -> Opt
         hourly_forecast = []
         
         if hourly.get('time'):
-            for i in range(len(hourly['time'])):
-                hourly_forecast.append({
-                    'time': hourly['time'][i],
-                    'temperature': hourly['temperature_2m'][i] if hourly.get('temperature_2m') else None,
-                    'dewpoint': hourly['dewpoint_2m'][i] if hourly.get('dewpoint_2m') else None,
-                    'precipitation_prob': hourly['precipitation_probability'][i] if hourly.get('precipitation_probability') else None,
-                    'weather_code': hourly['weather_code'][i] if hourly.get('weather_code') else None,
-                    'cloud_cover': hourly['cloud_cover'][i] if hourly.get('cloud_cover') else None,
-                    'cloud_cover_low': hourly['cloud_cover_low'][i] if hourly.get('cloud_cover_low') else None,
-                    'cloud_cover_mid': hourly['cloud_cover_mid'][i] if hourly.get('cloud_cover_mid') else None,
-                    'cloud_cover_high': hourly['cloud_cover_high'][i] if hourly.get('cloud_cover_high') else None,
-                    'visibility': hourly['visibility'][i] / 1000 if hourly.get('visibility') else None,  # Convertir metros a km
-                    'wind_speed': hourly['wind_speed_10m'][i] if hourly.get('wind_speed_10m') else None,
-                    'wind_direction': hourly['wind_direction_10m'][i] if hourly.get('wind_direction_10m') else None,
-                    'wind_gusts': hourly['wind_gusts_10m'][i] if hourly.get('wind_gusts_10m') else None,
-                    'freezing_level_height': hourly['freezing_level_height'][i] if hourly.get('freezing_level_height') else None,
-                    'snow_depth': hourly['snow_depth'][i] if hourly.get('snow_depth') else None,
-                    'is_day': hourly['is_day'][i] if hourly.get('is_day') else None,  # 1 = dia, 0 = noche
-                })
+            # Las columnas de Open-Meteo se resuelven una vez y las filas se montan con zip
+            times = hourly['time']
+            columns = [_column(hourly, api_key, len(times)) for _, api_key in _HOURLY_FIELDS]
+            vis_idx = _HOURLY_KEYS.index('visibility')
+            columns[vis_idx] = [v / 1000 if v is not None else None for v in columns[vis_idx]]  # metros → km
+            hourly_forecast = [
+                dict(zip(_HOURLY_ROW_KEYS, row))
+                for row in zip(times, *columns)
+            ]
         
         # Índice de horas diurnas por fecha para cálculos Phase 4
         # Filtra solo horas con is_day==1 para análisis relevante para pilotos
+        time_keys = _split_times(hourly_forecast)
         hourly_day_by_date: dict = {}
-        for h in hourly_forecast:
+        for h, (date_key, hour, hhmm) in zip(hourly_forecast, time_keys):
             if h.get('is_day') != 1:
                 continue
-            date_key = h['time'][:10]  # 'YYYY-MM-DD'
-            hourly_day_by_date.setdefault(date_key, []).append(h)
-
-        def _phase4_summary(day_rows: list) -> dict:
-            """Calcula resumen de parámetros Phase 4 para una lista de horas diurnas."""
-            result = {}
-
-            # 1️⃣ Freezing level mínimo del día (metros y pies)
-            fl_vals = [(h['freezing_level_height'], h['time']) for h in day_rows if h.get('freezing_level_height') is not None]
-            if fl_vals:
-                min_fl_m, min_fl_t = min(fl_vals, key=lambda x: x[0])
-                result['freezing_level_min_m'] = round(min_fl_m)
-                result['freezing_level_min_ft'] = round(min_fl_m * 3.28084)
-                result['freezing_level_min_time'] = min_fl_t[11:16]  # 'HH:MM'
-
-            # 2️⃣ Turbulencia mecánica: máx diferencia racha-viento (kt) del día
-            turb_diffs = []
-            for h in day_rows:
-                wind_kmh = h.get('wind_speed')
-                gust_kmh = h.get('wind_gusts')
-                if wind_kmh is not None and gust_kmh is not None:
-                    diff_kt = (gust_kmh - wind_kmh) / 1.852
-                    turb_diffs.append(diff_kt)
-            if turb_diffs:
-                result['turb_diff_max_kt'] = round(max(turb_diffs), 1)
-
-            # 5️⃣ Nieve máxima del día (m → cm)
-            snow_vals = [h['snow_depth'] for h in day_rows if h.get('snow_depth') is not None]
-            if snow_vals:
-                max_snow_m = max(snow_vals)
-                result['snow_max_cm'] = round(max_snow_m * 100, 1)
-
-            # 6️⃣ Nubes por capa: cobertura máxima del día
-            for key, field in [('cloud_low_max', 'cloud_cover_low'),
-                                ('cloud_mid_max', 'cloud_cover_mid'),
-                                ('cloud_high_max', 'cloud_cover_high')]:
-                vals = [h[field] for h in day_rows if h.get(field) is not None]
-                if vals:
-                    result[key] = round(max(vals))
-
-            # 7️⃣ Patrón temporal mañana (09-13h) vs tarde (14-21h)
-            # Permite detectar si el día empeora/mejora a lo largo de la jornada
-            for period_key, h_min, h_max in [('man', 9, 13), ('tard', 14, 21)]:
-                rows_p = [h for h in day_rows
-                          if h.get('time') and h_min <= int(h['time'][11:13]) <= h_max]
-                if not rows_p:
-                    continue
-                gusts = [h['wind_gusts'] for h in rows_p if h.get('wind_gusts') is not None]
-                winds = [h['wind_speed']  for h in rows_p if h.get('wind_speed')  is not None]
-                cl_lo = [h['cloud_cover_low']  for h in rows_p if h.get('cloud_cover_low')  is not None]
-                cl_mi = [h['cloud_cover_mid']  for h in rows_p if h.get('cloud_cover_mid')  is not None]
-                cl_hi = [h['cloud_cover_high'] for h in rows_p if h.get('cloud_cover_high') is not None]
-                pp    = [h['precipitation_prob'] for h in rows_p if h.get('precipitation_prob') is not None]
-                # turbulencia mecánica por período (diff racha-viento en kt)
-                turb_p = []
-                for h in rows_p:
-                    w = h.get('wind_speed')
-                    g = h.get('wind_gusts')
-                    if w is not None and g is not None:
-                        turb_p.append((g - w) / 1.852)
-                if gusts:  result[f'gust_{period_key}_max']       = round(max(gusts))
-                if winds:  result[f'wind_{period_key}_max']       = round(max(winds))
-                if cl_lo:  result[f'cloud_low_{period_key}_max']  = round(max(cl_lo))
-                if cl_mi:  result[f'cloud_mid_{period_key}_max']  = round(max(cl_mi))
-                if cl_hi:  result[f'cloud_high_{period_key}_max'] = round(max(cl_hi))
-                if pp:     result[f'precip_prob_{period_key}_max'] = round(max(pp))
-                if turb_p: result[f'turb_diff_{period_key}_max']  = round(max(turb_p), 1)
-
-            # Hora del pico de rachas (útil para planificar franja horaria)
-            gust_by_hour = [(h.get('wind_gusts', 0), h['time'][11:16])
-                            for h in day_rows if h.get('wind_gusts') is not None]
-            if gust_by_hour:
-                result['peak_gust_hour'] = max(gust_by_hour, key=lambda x: x[0])[1]
-
-            return result
+            hourly_day_by_date.setdefault(date_key, []).append((hour, hhmm, h))
 
         # Añadir pronóstico diario (4 días)
         daily = data.get('daily', {})
         daily_forecast = []
         
         if daily.get('time'):
-            for i in range(len(daily['time'])):
-                date_str = daily['time'][i]
-                entry = {
-                    'date': date_str,
-                    'temp_max': daily['temperature_2m_max'][i] if daily.get('temperature_2m_max') else None,
-                    'temp_min': daily['temperature_2m_min'][i] if daily.get('temperature_2m_min') else None,
-                    'dewpoint_max': daily['dewpoint_2m_max'][i] if daily.get('dewpoint_2m_max') else None,
-                    'dewpoint_min': daily['dewpoint_2m_min'][i] if daily.get('dewpoint_2m_min') else None,
-                    'sunrise': daily['sunrise'][i] if daily.get('sunrise') else None,
-                    'sunset': daily['sunset'][i] if daily.get('sunset') else None,
-                    'precipitation': daily['precipitation_sum'][i] if daily.get('precipitation_sum') else None,
-                    'precipitation_hours': daily['precipitation_hours'][i] if daily.get('precipitation_hours') else None,
-                    'wind_max': daily['wind_speed_10m_max'][i] if daily.get('wind_speed_10m_max') else None,
-                    'wind_gusts_max': daily['wind_gusts_10m_max'][i] if daily.get('wind_gusts_10m_max') else None,
-                    'wind_direction_dominant': daily['wind_direction_10m_dominant'][i] if daily.get('wind_direction_10m_dominant') else None,
-                    'weather_code': daily['weather_code'][i] if daily.get('weather_code') else None,
-                    'cape_max': daily['cape_max'][i] if daily.get('cape_max') else None,
-                    'precipitation_prob_max': daily['precipitation_probability_max'][i] if daily.get('precipitation_probability_max') else None,
-                    'sunshine_duration': daily['sunshine_duration'][i] if daily.get('sunshine_duration') else None,
-                }
+            fog_scored_hours = _score_fog_hours(hourly_forecast, time_keys)
+            times = daily['time']
+            columns = [_column(daily, api_key, len(times)) for _, api_key in _DAILY_FIELDS]
+            for row in zip(times, *columns):
+                entry = dict(zip(_DAILY_ROW_KEYS, row))
+                date_str = entry['date']
                 # Enriquecer con resúmenes Phase 4 calculados en Python
                 day_rows = hourly_day_by_date.get(date_str, [])
                 entry.update(_phase4_summary(day_rows))
-                entry['fog_risk'] = _compute_fog_risk(date_str, hourly_forecast)
+                entry['fog_risk'] = _compute_fog_risk(date_str, fog_scored_hours)
                 daily_forecast.append(entry)
         
         _result = {
@@ -379,9 +475,7 @@ def get_weather_forecast(lat: float, lon: float, location_name: str = "") -> Opt
             'daily_forecast': daily_forecast
         }
         with _WF_CACHE_LOCK:
-            _WF_CACHE["key"] = _cache_key
-            _WF_CACHE["data"] = _result
-            _WF_CACHE["expires_at"] = datetime.utcnow() + timedelta(seconds=_WF_CACHE_TTL)
+            _WF_CACHE[_cache_key] = (_next_quarter_hour_epoch(time.time()), _result)
         return _result
 
     except requests.exceptions.RequestException as e:
@@ -392,6 +486,35 @@ def get_weather_forecast(lat: float, lon: float, location_name: str = "") -> Opt
         return None
 
 
+# Códigos WMO -> descripción (solo lectura)
+_WEATHER_CODES = MappingProxyType({
+    0: "Cielo despejado",
+    1: "Principalmente despejado",
+    2: "Parcialmente nublado",
+    3: "Nublado",
+    45: "Niebla",
+    48: "Niebla con escarcha",
+    51: "Llovizna ligera",
+    53: "Llovizna moderada",
+    55: "Llovizna intensa",
+    61: "Lluvia ligera",
+    63: "Lluvia moderada",
+    65: "Lluvia intensa",
+    71: "Nevada ligera",
+    73: "Nevada moderada",
+    75: "Nevada intensa",
+    77: "Granos de nieve",
+    80: "Chubascos ligeros",
+    81: "Chubascos moderados",
+    82: "Chubascos violentos",
+    85: "Chubascos de nieve ligeros",
+    86: "Chubascos de nieve intensos",
+    95: "Tormenta",
+    96: "Tormenta con granizo ligero",
+    99: "Tormenta con granizo intenso"
+})
+
+
 def weather_code_to_description(code: int) -> str:
     """
     Convierte el código WMO weather code a descripción en español
@@ -402,34 +525,7 @@ def weather_code_to_description(code: int) -> str:
     Returns:
         Descripción del tiempo en español
     """
-    weather_codes = {
-        0: "Cielo despejado",
-        1: "Principalmente despejado",
-        2: "Parcialmente nublado",
-        3: "Nublado",
-        45: "Niebla",
-        48: "Niebla con escarcha",
-        51: "Llovizna ligera",
-        53: "Llovizna moderada",
-        55: "Llovizna intensa",
-        61: "Lluvia ligera",
-        63: "Lluvia moderada",
-        65: "Lluvia intensa",
-        71: "Nevada ligera",
-        73: "Nevada moderada",
-        75: "Nevada intensa",
-        77: "Granos de nieve",
-        80: "Chubascos ligeros",
-        81: "Chubascos moderados",
-        82: "Chubascos violentos",
-        85: "Chubascos de nieve ligeros",
-        86: "Chubascos de nieve intensos",
-        95: "Tormenta",
-        96: "Tormenta con granizo ligero",
-        99: "Tormenta con granizo intenso"
-    }
-    
-    return weather_codes.get(code, f"Código desconocido: {code}")
+    return _WEATHER_CODES.get(code, f"Código desconocido: {code}")
 
 
 
@@ -3,15 +3,28 @@ Aplicación web meteorológica para pilotos ULM de La Morgal (LEMR).
 Interfaz web moderna con actualización automática cada hora de 06:00 a 23:00.
 Integra mapas AEMET, METAR LEAS, Open-Meteo, Windy y análisis IA.
 """
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta
-from threading import Lock, Thread
+from functools import lru_cache
+from itertools import groupby
+from operator import itemgetter
+from pathlib import Path
+from threading import Lock, Thread, get_ident
+import gzip
+import hashlib
+import json
+import os
+import tempfile
 import time as _time
-from zoneinfo import ZoneInfo
-from flask import Flask, jsonify, render_template, request
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from flask import Flask, abort, jsonify, redirect, render_template, request, send_file
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
 import config
+import json_codec
 from ai_service import (
     interpret_fused_forecast_with_ai,
     get_last_ai_execution,
@@ -21,21 +34,25 @@ from aemet_service import (
     get_analysis_map_url,
     get_analysis_map_b64,
     get_avisos_cap_asturias,
+    get_aemet_request_count,
 )
 from metar_service import get_metar, classify_flight_category
 from metar_generator import generate_metar_lemr, get_metar_disclaimer
 from weather_service import get_weather_forecast, weather_code_to_description
 from windy_service import get_windy_point_forecast
 from telegram_monitor import send_alert as _tg_alert
+from timezones import MADRID_TZ, UTC_TZ
 
 app = Flask(__name__)
 
-# Rate limiting: previene abuso y DoS
+# Rate limiting: previene abuso y DoS. Con almacén compartido (Redis/Memcached) los
+# límites son globales entre workers; si cae, se sigue limitando en memoria.
 limiter = Limiter(
     app=app,
     key_func=get_remote_address,
     default_limits=["1000 per hour", "100 per minute"],
-    storage_uri="memory://"
+    storage_uri=config.RATELIMIT_STORAGE_URI,
+    in_memory_fallback_enabled=True,
 )
 
 
@@ -43,6 +60,9 @@ limiter = Limiter(
 # FUNCIONES OGIMET (Vista Semanal Rápida)
 # ============================================================================
 
+_WEEKDAY_SHORT = ("Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom")
+
+
 def _build_ogimet_image_url(date_str: str, run: str, projection_hours: int) -> str:
     """Construye URL directa de imagen Ogimet."""
     proy_str = f"{projection_hours:03d}"
@@ -52,12 +72,49 @@ def _build_ogimet_image_url(date_str: str, run: str, projection_hours: int) -> s
     )
 
 
+def _build_ogimet_proxy_url(date_str: str, run: str, projection_hours: int) -> str:
+    """URL local que sirve la imagen Ogimet desde la caché en disco."""
+    return f"/cache/ogimet/{date_str}/{run}/{projection_hours}.jpg"
+
+
+# Sesión HTTP compartida para ogimet.com: keep-alive entre las sondas HEAD y las descargas
+# de mapas (evita un handshake TLS por petición). 2 reintentos rápidos ante error de red o 5xx.
+_OGIMET_SESSION = requests.Session()
+_OGIMET_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=2,
+    pool_maxsize=16,
+    max_retries=Retry(
+        total=2,
+        backoff_factor=0.2,
+        status_forcelist=(502, 503, 504),
+        raise_on_status=False,
+    ),
+))
+
+
+# Caché en disco de mapas Ogimet: cada imagen (~200 KB) se descarga una sola vez
+# y después la sirve Flask a navegadores e IA. Solo se sirven (y conservan) las
+# proyecciones de la vista semanal del run vigente y del anterior.
+_OGIMET_IMG_CACHE_DIR = Path(tempfile.gettempdir()) / "lemr-img-cache"
+_OGIMET_PROJECTION_HOURS = range(12, 193, 6)
+_OGIMET_IMG_MAX_AGE = 6 * 3600  # segundos (Cache-Control)
+_OGIMET_WEEK_MAX_AGE = 6 * 3600  # tope de Cache-Control para /api/ogimet/week
+_OGIMET_IMG_LOCK = Lock()
+
+
+def _prune_ogimet_image_cache(keep_runs: set[str]) -> None:
+    """Borra las imágenes de runs que ya no se sirven (nombre: fecha+run+H+horas.jpg)."""
+    for old in _OGIMET_IMG_CACHE_DIR.glob("*.jpg"):
+        if old.name[:10] not in keep_runs:
+            old.unlink(missing_ok=True)
+
+
 def _get_latest_ogimet_run_fast():
     """
     Calcula el run de Ogimet más reciente SIN hacer requests HTTP.
     Ogimet genera runs a las 00Z y 12Z, disponibles ~5-6 horas después.
     """
-    utc_now = datetime.now(ZoneInfo("UTC"))
+    utc_now = datetime.now(UTC_TZ)
     
     # Ogimet tarda ~5-6h en publicar el run. Umbral 19 UTC (no 18) para
     # garantizar que el run 12Z esté completo antes de apuntar a él.
@@ -72,86 +129,139 @@ def _get_latest_ogimet_run_fast():
         run_date = utc_now - timedelta(days=1)
     
     return {
-        'date_str': run_date.strftime("%Y%m%d"),
+        'date_str': f"{run_date.year:04d}{run_date.month:02d}{run_date.day:02d}",
         'run': run,
         'run_date': run_date
     }
 
 
+def _servable_ogimet_runs() -> set[str]:
+    """Runs (fecha+run, p. ej. '2026030112') del run vigente y del anterior."""
+    latest = _get_latest_ogimet_run_fast()
+    if latest['run'] == "12":
+        previous = f"{latest['date_str']}00"
+    else:
+        prev_date = latest['run_date'] - timedelta(days=1)
+        previous = f"{prev_date.year:04d}{prev_date.month:02d}{prev_date.day:02d}12"
+    return {f"{latest['date_str']}{latest['run']}", previous}
+
+
 def get_ogimet_week_forecast():
     """
     Genera previsión semanal de Ogimet (7 días, 1 mapa por día).
     Versión rápida: no verifica existencia de imágenes.
     Prefiere proyecciones cercanas a las 12:00 UTC (mediodía).
     """
+    return _build_ogimet_week(*_ogimet_week_key())
+
+
+def _ogimet_week_key() -> tuple[str, str, date]:
+    """Clave (date_str, run, hoy local) que determina por completo la previsión semanal."""
     latest_run = _get_latest_ogimet_run_fast()
-    run_time = datetime.strptime(f"{latest_run['date_str']} {latest_run['run']}", "%Y%m%d %H")
-    
-    today = datetime.now(MADRID_TZ).date()
-    weekday_short = ["Lun", "Mar", "Mié", "Jue", "Vie", "Sáb", "Dom"]
+    return latest_run['date_str'], latest_run['run'], datetime.now(MADRID_TZ).date()
+
+
+def _seconds_until_ogimet_week_change() -> int:
+    """Segundos hasta que cambie _ogimet_week_key(): umbral de run (07/19 UTC) o medianoche local."""
+    utc_now = datetime.now(UTC_TZ)
+    hour_start = utc_now.replace(minute=0, second=0, microsecond=0)
+    next_run = min(
+        t for t in (
+            hour_start.replace(hour=7),
+            hour_start.replace(hour=19),
+            hour_start.replace(hour=7) + timedelta(days=1),
+        ) if t > utc_now
+    )
+    local_now = utc_now.astimezone(MADRID_TZ)
+    next_midnight = (local_now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+    return max(0, int((min(next_run, next_midnight) - utc_now).total_seconds()))
+
+
+@lru_cache(maxsize=4)
+def _build_ogimet_week(date_str: str, run: str, today: date) -> dict:
+    """
+    Construye la previsión semanal para un run y un día local dados.
+    Solo depende de esos tres valores (el run cambia cada 12h), así que se memoiza.
+    El dict devuelto se comparte entre peticiones: no modificarlo.
+    """
+    run_time = datetime(int(date_str[:4]), int(date_str[4:6]), int(date_str[6:8]), int(run))
+    weekday_short = _WEEKDAY_SHORT
     
-    # Recopilar todas las proyecciones y agruparlas por día
+    # Recopilar todas las proyecciones y quedarse, por día, con la más cercana
+    # al mediodía (12:00 UTC): día -> (horas, valid_time, distancia)
     daily_projections = {}
-    
-    for hours in range(12, 193, 6):
-        valid_time = run_time + timedelta(hours=hours)
+    step = timedelta(hours=6)
+    valid_time = run_time + timedelta(hours=12)
+    for hours in _OGIMET_PROJECTION_HOURS:
         day_key = valid_time.date()
-        
-        # Calcular distancia al mediodía (12:00 UTC)
         distance_to_noon = abs(valid_time.hour - 12)
-        
-        # Si no tenemos este día, o si esta proyección está más cerca del mediodía
-        if day_key not in daily_projections or distance_to_noon < daily_projections[day_key]['distance']:
-            daily_projections[day_key] = {
-                'hours': hours,
-                'valid_time': valid_time,
-                'distance': distance_to_noon
-            }
+        best = daily_projections.get(day_key)
+        if best is None or distance_to_noon < best[2]:
+            daily_projections[day_key] = (hours, valid_time, distance_to_noon)
+        valid_time += step
     
     # Ordenar por fecha y tomar los primeros 7 días
-    sorted_days = sorted(daily_projections.keys())[:7]
+    sorted_days = sorted(daily_projections)[:7]
+    tomorrow = today + timedelta(days=1)
+    day_after = today + timedelta(days=2)
     
     week_forecast = []
     for day_key in sorted_days:
-        proj = daily_projections[day_key]
-        valid_time = proj['valid_time']
-        hours = proj['hours']
+        hours, valid_time, _ = daily_projections[day_key]
+        weekday = weekday_short[day_key.weekday()]
         
         # Etiqueta del día
         if day_key == today:
             day_label = "HOY"
-        elif day_key == today + timedelta(days=1):
+        elif day_key == tomorrow:
             day_label = "MAÑANA"
-        elif day_key == today + timedelta(days=2):
+        elif day_key == day_after:
             day_label = "PASADO"
         else:
-            day_label = weekday_short[day_key.weekday()]
+            day_label = weekday
         
-        image_url = _build_ogimet_image_url(latest_run['date_str'], latest_run['run'], hours)
+        # valid_time cae en day_key: mismo día de la semana
+        valid_day = f"{valid_time.day:02d}/{valid_time.month:02d}"
+        valid_hour = f"{valid_time.hour:02d}:00"
         
         week_forecast.append({
-            'date': day_key.strftime("%Y-%m-%d"),
+            'date': day_key.isoformat(),
             'day_label': day_label,
-            'weekday': weekday_short[day_key.weekday()],
-            'date_formatted': day_key.strftime("%d/%m"),
-            'image_url': image_url,
-            'valid_time': f"{weekday_short[valid_time.weekday()]} {valid_time.strftime('%d/%m %H:00')}",
-            'description': f"Válido para {weekday_short[valid_time.weekday()]} {valid_time.strftime('%d/%m/%Y %H:00 UTC')}",
+            'weekday': weekday,
+            'date_formatted': valid_day,
+            'image_url': _build_ogimet_proxy_url(date_str, run, hours),
+            'source_url': _build_ogimet_image_url(date_str, run, hours),
+            'valid_time': f"{weekday} {valid_day} {valid_hour}",
+            'description': f"Válido para {weekday} {valid_day}/{valid_time.year} {valid_hour} UTC",
             'projection_hours': hours
         })
     
+    run_label = f"Run {run}:00 UTC del {date_str[6:8]}/{date_str[4:6]}/{date_str[:4]}"
     return {
         'success': True,
         'run_info': {
-            'date': latest_run['date_str'],
-            'run': latest_run['run'],
-            'label': f"Run {latest_run['run']}:00 UTC del {run_time.strftime('%d/%m/%Y')}",
-            'full_label': f"Run {latest_run['run']}:00 UTC del {run_time.strftime('%d/%m/%Y')}"
+            'date': date_str,
+            'run': run,
+            'label': run_label,
+            'full_label': run_label
         },
         'week': week_forecast,
         'total_days': len(week_forecast)
     }
 
+
+@lru_cache(maxsize=4)
+def _ogimet_week_json(date_str: str, run: str, today: date) -> bytes:
+    """Previsión semanal ya serializada: /api/ogimet/week la sirve sin volver a codificarla."""
+    return json_codec.dumps(_build_ogimet_week(date_str, run, today))
+
+
+@lru_cache(maxsize=4)
+def _ogimet_week_gzip(date_str: str, run: str, today: date) -> bytes:
+    """La misma previsión semanal comprimida con gzip una sola vez (mtime=0: bytes estables)."""
+    return gzip.compress(_ogimet_week_json(date_str, run, today), compresslevel=6, mtime=0)
+
+
 # ============================================================================
 
 
@@ -226,33 +336,57 @@ def get_weather_icon_from_text(prediction_text: str) -> str:
     return "🌦️"
 
 
+# weekday() devuelve 0=lunes, 6=domingo
+_DIAS_CAP = ("Lunes", "Martes", "Miércoles", "Jueves", "Viernes", "Sábado", "Domingo")
+_MESES = (
+    "enero", "febrero", "marzo", "abril", "mayo", "junio",
+    "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre",
+)
+
+
 def format_date_spanish(date_obj: date) -> str:
     """
     Formatea una fecha en español sin depender del locale del sistema.
     Formato: "Domingo, 15 de febrero de 2026"
     """
-    dias = ["lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo"]
-    meses = [
-        "enero", "febrero", "marzo", "abril", "mayo", "junio",
-        "julio", "agosto", "septiembre", "octubre", "noviembre", "diciembre"
-    ]
-    
-    # weekday() devuelve 0=lunes, 6=domingo
-    dia_nombre = dias[date_obj.weekday()].capitalize()
-    mes_nombre = meses[date_obj.month - 1]
-    
-    return f"{dia_nombre}, {date_obj.day} de {mes_nombre} de {date_obj.year}"
+    return _format_date_spanish_ordinal(date_obj.toordinal())
+
+
+@lru_cache(maxsize=64)
+def _format_date_spanish_ordinal(ordinal: int) -> str:
+    date_obj = date.fromordinal(ordinal)
+    return f"{_DIAS_CAP[date_obj.weekday()]}, {date_obj.day} de {_MESES[date_obj.month - 1]} de {date_obj.year}"
 
 
-MADRID_TZ = ZoneInfo("Europe/Madrid")
 UPDATE_SLOTS = list(range(6, 24))  # Cada hora de 06:00 a 23:00
+# Reporte cacheado como tupla inmutable (cache_key, generated_at, payload). Los lectores
+# la leen sin lock (reasignar una referencia es atómico); los escritores publican una
+# tupla nueva bajo _CACHE_LOCK. La generación síncrona se serializa con _CACHE_BUILD_LOCK
+# para no retener _CACHE_LOCK durante minutos.
 _CACHE_LOCK = Lock()
-_CACHE = {
-    "cache_key": None,
-    "generated_at": None,
-    "payload": None,
-}
+_CACHE_BUILD_LOCK = Lock()
+_CACHE_ENTRY: tuple[str, str, dict] | None = None
 _WARMER_STARTED = False
+# Claves de caché con una regeneración en background en curso (protegido por _CACHE_LOCK)
+_REFRESH_IN_FLIGHT: set[str] = set()
+# Pool acotado para esas regeneraciones: reutiliza hilos en vez de crear uno por ciclo
+# (los hilos se crean al primer submit)
+_REFRESH_POOL = ThreadPoolExecutor(max_workers=2, thread_name_prefix="report-refresh")
+# Caché negativa: clave → instante (monotonic) del último fallo de regeneración en background.
+# Mientras upstream (AEMET, Open-Meteo...) falle no se relanza en cada petición.
+_REFRESH_FAILED_AT: dict[str, float] = {}
+_REFRESH_RETRY_DELAY = 60  # segundos
+# Último index.html renderizado como tupla (payload, html); el payload se compara por
+# identidad. Se lee y se reemplaza sin lock: una carrera como mucho repite el render
+_RENDERED_INDEX: tuple[dict, str] | None = None
+# Copia en disco del último reporte: tras reiniciar se sirve mientras se regenera
+_CACHE_SNAPSHOT_PATH = Path(tempfile.gettempdir()) / "lemr_report_cache.json"
+_CACHE_SNAPSHOT_MAX_AGE = timedelta(hours=6)
+_CACHE_SNAPSHOT_LOCK = Lock()
+# Sección Windy por "ciclo|modelo": /api/windy reutiliza lo ya descargado para el reporte
+_WINDY_SECTION_LOCK = Lock()
+_WINDY_BUILD_LOCK = Lock()
+_WINDY_SECTION_CACHE: dict[str, dict] = {}
 
 # Caché independiente para METAR en vivo (alineada a cuartos de hora :15/:30/:45)
 _METAR_CACHE_LOCK = Lock()
@@ -272,69 +406,180 @@ def _next_live_refresh_boundary(now: datetime) -> datetime:
     return candidate
 
 SUPPORTED_WINDY_MODELS = ["gfs", "iconEu", "arome"]
+# Nombre en minúsculas → nombre canónico del modelo
+_WINDY_MODEL_LOOKUP = {model.lower(): model for model in SUPPORTED_WINDY_MODELS}
+# Mapa Windy de respaldo (sin datos de la API): solo cambia el modelo
+_LEMR_LAT = config.LA_MORGAL_COORDS["lat"]
+_LEMR_LON = config.LA_MORGAL_COORDS["lon"]
+_WINDY_EMBED_URL_PREFIX = (
+    f"https://embed.windy.com/embed2.html?lat={_LEMR_LAT}&lon={_LEMR_LON}"
+    "&zoom=9&level=surface&overlay=wind&menu=&message=true&marker=true&calendar=24"
+    "&pressure=true&type=map&location=coordinates"
+    f"&detail=true&detailLat={_LEMR_LAT}&detailLon={_LEMR_LON}"
+    "&metricWind=km%2Fh&metricTemp=%C2%B0C&model="
+)
+_WINDY_MAP_LINK = f"https://www.windy.com/?{_LEMR_LAT},{_LEMR_LON},10"
 
+# Configuración IA invariante durante la vida del proceso
+_AI_MODEL_CASCADE = getattr(config, "AI_MODEL_CASCADE", [])
+_AI_PRIMARY_MODEL = _AI_MODEL_CASCADE[0] if _AI_MODEL_CASCADE else "gpt-4o"
+_AI_PROVIDER = getattr(config, "AI_PROVIDER", "github").lower()
+# Excluir mapas para: mini models O GitHub (60k tokens/min - muy restrictivo)
+# Solo incluir mapas para OpenAI (límite de tokens más alto)
+_AI_INCLUDE_MAPS = "mini" not in _AI_PRIMARY_MODEL.lower() and _AI_PROVIDER != "github"
 
-def _build_cycle_id(now_local: datetime) -> str:
-    current_hour = now_local.hour
 
-    slot = None
-    for candidate in UPDATE_SLOTS:
-        if current_hour >= candidate:
-            slot = candidate
+# Slot de actualización vigente para cada hora local (None antes del primer slot)
+_SLOT_BY_HOUR = tuple(
+    max((slot for slot in UPDATE_SLOTS if slot <= hour), default=None) for hour in range(24)
+)
 
+
+def _build_cycle_id(now_local: datetime) -> str:
+    slot = _SLOT_BY_HOUR[now_local.hour]
     cycle_date = now_local.date()
     if slot is None:
         slot = UPDATE_SLOTS[-1]
         cycle_date = cycle_date - timedelta(days=1)
+    return _format_cycle_id(cycle_date, slot)
 
+
+@lru_cache(maxsize=64)
+def _format_cycle_id(cycle_date: date, slot: int) -> str:
     return f"{cycle_date.isoformat()}-{slot:02d}"
 
 
 def _sanitize_windy_model(value: str | None) -> str:
     if not value:
         return config.WINDY_MODEL
-    for model in SUPPORTED_WINDY_MODELS:
-        if value.lower() == model.lower():
-            return model
-    return config.WINDY_MODEL
+    return _WINDY_MODEL_LOOKUP.get(value.lower(), config.WINDY_MODEL)
 
 
 def _build_windy_section(selected_windy_model: str) -> dict:
-    windy_data = get_windy_point_forecast(
-        config.LA_MORGAL_COORDS["lat"],
-        config.LA_MORGAL_COORDS["lon"],
-        selected_windy_model,
-    )
+    windy_data = get_windy_point_forecast(_LEMR_LAT, _LEMR_LON, selected_windy_model)
+
+    if windy_data:
+        return {
+            "provider": windy_data.get("provider"),
+            "model": windy_data.get("model"),
+            "lat": windy_data.get("lat"),
+            "lon": windy_data.get("lon"),
+            "available_models": SUPPORTED_WINDY_MODELS,
+            "hourly": windy_data.get("hourly", [])[:24],
+            "daily_summary": windy_data.get("daily_summary", []),
+            "error": windy_data.get("error"),
+            "map_embed_url": windy_data.get("map_embed_url"),
+            "map_link": windy_data.get("map_link"),
+        }
 
     return {
-        "provider": windy_data.get("provider") if windy_data else "Windy Point Forecast",
-        "model": windy_data.get("model") if windy_data else selected_windy_model,
-        "lat": windy_data.get("lat") if windy_data else config.LA_MORGAL_COORDS["lat"],
-        "lon": windy_data.get("lon") if windy_data else config.LA_MORGAL_COORDS["lon"],
+        "provider": "Windy Point Forecast",
+        "model": selected_windy_model,
+        "lat": _LEMR_LAT,
+        "lon": _LEMR_LON,
         "available_models": SUPPORTED_WINDY_MODELS,
-        "hourly": windy_data.get("hourly", [])[:24] if windy_data else [],
-        "daily_summary": windy_data.get("daily_summary", []) if windy_data else [],
-        "error": windy_data.get("error") if windy_data else None,
-        "map_embed_url": windy_data.get("map_embed_url") if windy_data else (
-            f"https://embed.windy.com/embed2.html?lat={config.LA_MORGAL_COORDS['lat']}&lon={config.LA_MORGAL_COORDS['lon']}"
-            "&zoom=9&level=surface&overlay=wind&menu=&message=true&marker=true&calendar=24"
-            "&pressure=true&type=map&location=coordinates"
-            f"&detail=true&detailLat={config.LA_MORGAL_COORDS['lat']}&detailLon={config.LA_MORGAL_COORDS['lon']}"
-            f"&metricWind=km%2Fh&metricTemp=%C2%B0C&model={selected_windy_model}"
-        ),
-        "map_link": windy_data.get("map_link") if windy_data else (
-            f"https://www.windy.com/?{config.LA_MORGAL_COORDS['lat']},{config.LA_MORGAL_COORDS['lon']},10"
-        ),
+        "hourly": [],
+        "daily_summary": [],
+        "error": None,
+        "map_embed_url": _WINDY_EMBED_URL_PREFIX + selected_windy_model,
+        "map_link": _WINDY_MAP_LINK,
+    }
+
+
+def _get_windy_section(selected_windy_model: str) -> dict:
+    """Sección Windy del ciclo actual; solo se cachean respuestas con datos horarios."""
+    cycle_id = _build_cycle_id(datetime.now(MADRID_TZ))
+    key = f"{cycle_id}|{selected_windy_model}"
+    with _WINDY_SECTION_LOCK:
+        cached = _WINDY_SECTION_CACHE.get(key)
+    if cached is not None:
+        return cached
+    # Una sola descarga a la vez: si el reporte y /api/windy fallan la caché a la vez,
+    # el segundo espera y reutiliza el resultado del primero
+    with _WINDY_BUILD_LOCK:
+        with _WINDY_SECTION_LOCK:
+            cached = _WINDY_SECTION_CACHE.get(key)
+        if cached is not None:
+            return cached
+        section = _build_windy_section(selected_windy_model)
+        if section.get("hourly"):
+            with _WINDY_SECTION_LOCK:
+                # Descartar ciclos anteriores: solo se sirve el ciclo vigente
+                for old_key in [k for k in _WINDY_SECTION_CACHE if not k.startswith(f"{cycle_id}|")]:
+                    del _WINDY_SECTION_CACHE[old_key]
+                _WINDY_SECTION_CACHE[key] = section
+    return section
+
+
+def _fetch_analysis_map() -> tuple:
+    """
+    Mapa de análisis (URL + base64). La base64 solo se pide si hay URL.
+    El espaciado entre peticiones a AEMET lo garantiza aemet_service aunque
+    otras tareas (avisos CAP) se ejecuten en paralelo.
+    """
+    # URL temporal: para pasar a la IA (ligera, ~100 tokens)
+    analysis_map_url = get_analysis_map_url()
+    # Base64: para mostrar en navegador (evita CORS, pesada ~400KB)
+    analysis_map_b64 = get_analysis_map_b64() if analysis_map_url else None
+    return analysis_map_url, analysis_map_b64
+
+
+def _current_hour_row(current: dict, hourly_om: list) -> dict:
+    """Fila horaria de la hora en curso ("YYYY-MM-DDTHH"); la primera si no aparece."""
+    now_hour_str = current.get("time", "")[:13]
+    return next(
+        (h for h in hourly_om if h.get("time", "")[:13] == now_hour_str),
+        hourly_om[0] if hourly_om else {}
+    )
+
+
+def _build_current_block(current: dict, h_current: dict) -> dict:
+    """Condiciones actuales Open-Meteo (+ nubes por capas de la hora en curso) para la UI."""
+    return {
+        "time": current.get("time"),
+        "temperature": current.get("temperature"),
+        "feels_like": current.get("feels_like"),
+        "humidity": current.get("humidity"),
+        "wind_speed_kmh": current.get("wind_speed"),
+        "wind_direction": current.get("wind_direction"),
+        "wind_gusts_kmh": current.get("wind_gusts"),
+        "pressure": current.get("pressure"),
+        "cloud_cover": current.get("cloud_cover"),
+        "cloud_cover_low": h_current.get("cloud_cover_low"),
+        "cloud_cover_mid": h_current.get("cloud_cover_mid"),
+        "cloud_cover_high": h_current.get("cloud_cover_high"),
+        "precipitation": current.get("precipitation"),
+        "cape": current.get("cape"),
+        "condition": weather_code_to_description(current.get("weather_code")),
     }
 
 
 def _generate_report_payload(windy_model: str | None = None, include_ai: bool = True) -> dict:
-    from aemet_service import get_aemet_request_count
-    
     now_local = datetime.now(MADRID_TZ)
     aemet_count_start = get_aemet_request_count()
-    
-    metar_leas = get_metar(config.LEAS_ICAO)
+    selected_windy_model = _sanitize_windy_model(windy_model)
+
+    # Fuentes independientes en paralelo: el ciclo tarda max() de las latencias, no la suma
+    with ThreadPoolExecutor(max_workers=6, thread_name_prefix="report-fetch") as pool:
+        metar_future = pool.submit(get_metar, config.LEAS_ICAO)
+        weather_future = pool.submit(
+            get_weather_forecast,
+            config.LA_MORGAL_COORDS["lat"],
+            config.LA_MORGAL_COORDS["lon"],
+            config.LA_MORGAL_COORDS["name"],
+        )
+        windy_future = pool.submit(_get_windy_section, selected_windy_model)
+        sig_maps_future = pool.submit(get_significant_maps_for_three_days, ambito="esp")
+        analysis_map_future = pool.submit(_fetch_analysis_map)
+        avisos_future = pool.submit(get_avisos_cap_asturias)
+
+        metar_leas = metar_future.result()
+        weather_data = weather_future.result()
+        windy_section = windy_future.result()
+        sig_maps = sig_maps_future.result()
+        analysis_map_url, analysis_map_b64 = analysis_map_future.result()
+        avisos_cap = avisos_future.result()
+
     if not metar_leas:
         print("⚠️ METAR LEAS no disponible — sin observación en tiempo real del aeropuerto")
         _tg_alert(
@@ -342,13 +587,6 @@ def _generate_report_payload(windy_model: str | None = None, include_ai: bool =
             source="metar",
             level="WARNING",
         )
-    selected_windy_model = _sanitize_windy_model(windy_model)
-
-    weather_data = get_weather_forecast(
-        config.LA_MORGAL_COORDS["lat"],
-        config.LA_MORGAL_COORDS["lon"],
-        config.LA_MORGAL_COORDS["name"],
-    )
 
     if not weather_data:
         print("⚠️ Open-Meteo no disponible — continuando con datos parciales (sin condiciones actuales ni pronóstico)")
@@ -363,11 +601,7 @@ def _generate_report_payload(windy_model: str | None = None, include_ai: bool =
     current = weather_data.get("current", {})
     hourly_om = weather_data.get("hourly_forecast", [])
     # Usar la hora actual (no índice 0 = 00:00) para dewpoint, visibilidad y nubes bajas
-    _now_hour_str = current.get("time", "")[:13]  # "YYYY-MM-DDTHH"
-    _h_current = next(
-        (h for h in hourly_om if h.get("time", "")[:13] == _now_hour_str),
-        hourly_om[0] if hourly_om else {}
-    )
+    _h_current = _current_hour_row(current, hourly_om)
     _visibility_km = _h_current.get('visibility')
     _dewpoint_c = _h_current.get('dewpoint')
     _cloud_cover_low = _h_current.get('cloud_cover_low')
@@ -388,7 +622,6 @@ def _generate_report_payload(windy_model: str | None = None, include_ai: bool =
     daily = weather_data.get("daily_forecast", [])[:4]
 
     # ── Predicción Windy Point Forecast ──
-    windy_section = _build_windy_section(selected_windy_model)
     if not windy_section.get("hourly"):
         _tg_alert(
             f"Windy Point Forecast sin datos horarios (modelo: {selected_windy_model}). El analisis IA carecera de pronostico Windy.",
@@ -396,15 +629,7 @@ def _generate_report_payload(windy_model: str | None = None, include_ai: bool =
             level="WARNING",
         )
 
-    # ── Mapas significativos AEMET (hoy/mañana/pasado, AM y PM) ──
-    sig_maps = get_significant_maps_for_three_days(ambito="esp")
-
     # ── Mapa de análisis en superficie (isobaras, frentes) ──
-    # URL temporal: para pasar a la IA (ligera, ~100 tokens)
-    analysis_map_url = get_analysis_map_url()
-    # Base64: para mostrar en navegador (evita CORS, pesada ~400KB)
-    analysis_map_b64 = get_analysis_map_b64() if analysis_map_url else None
-    
     if analysis_map_b64:
         print(f"✅ Mapa análisis obtenido (URL para IA + base64 para navegador)")
     else:
@@ -416,22 +641,25 @@ def _generate_report_payload(windy_model: str | None = None, include_ai: bool =
         )
 
     # ── Avisos CAP (para la IA) ──
-    avisos_cap = get_avisos_cap_asturias()
     if avisos_cap:
         print(f"⚠️ AEMET AVISOS CAP activos: {avisos_cap[:80]}")
     # ── Construir días con mapas AEMET integrados (slots UTC reales disponibles) ──
-    sig_index = {}
-    for m in sig_maps:
-        sig_index.setdefault(m["date"], []).append(m)
+    # Ordenados una sola vez por (fecha, hora UTC) y agrupados por fecha
+    sig_index = {
+        day_iso: list(slots)
+        for day_iso, slots in groupby(
+            sorted(sig_maps, key=lambda m: (m["date"], m.get("utc_hour", "99"))),
+            key=itemgetter("date"),
+        )
+    }
 
     days = []
     labels = ["Hoy", "Mañana", "Pasado mañana", "Dentro de 3 días"]
     for index, day in enumerate(daily):
-        target_date = datetime.fromisoformat(day["date"]).date()
-        day_iso = target_date.isoformat()
         show_aemet_maps = index < 2
 
-        map_slots = sorted(sig_index.get(day_iso, []), key=lambda item: item.get("utc_hour", "99")) if show_aemet_maps else []
+        # Open-Meteo y aemet_service usan el mismo formato 'YYYY-MM-DD': la fecha sirve de clave tal cual
+        map_slots = sig_index.get(day["date"], []) if show_aemet_maps else []
         available_hours = [f"{slot.get('utc_hour')}" for slot in map_slots if slot.get("utc_hour")]
 
         days.append(
@@ -444,27 +672,22 @@ def _generate_report_payload(windy_model: str | None = None, include_ai: bool =
             }
         )
 
-    current = weather_data.get("current", {})
-
     metar_ai = "Análisis integrado en el veredicto final IA."
     weather_ai = "Análisis integrado en el veredicto final IA."
     windy_ai = "Análisis integrado en el veredicto final IA."
     map_ai = "Análisis integrado en el veredicto final IA."
 
+    # Clasificaciones de condiciones de vuelo (para la IA, el reporte y /api/current)
+    flight_cat_leas = classify_flight_category(metar_leas) if metar_leas else None
+    flight_cat_lemr = classify_flight_category(metar_lemr) if metar_lemr else None
+
     fused_ai = "⏳ Análisis IA en curso..."
     model_used_for_ui = None
-    model_cascade = getattr(config, "AI_MODEL_CASCADE", [])
-    primary_model = model_cascade[0] if model_cascade else "gpt-4o"
-    ai_provider = getattr(config, "AI_PROVIDER", "github").lower()
+    primary_model = _AI_PRIMARY_MODEL
+    ai_provider = _AI_PROVIDER
     if include_ai:
-        # Determinar si se va a usar gpt-4o o mini, y qué proveedor
-        is_mini = "mini" in primary_model.lower()
-        is_github = ai_provider == "github"
-        
-        # Excluir mapas para: mini models O GitHub (60k tokens/min - muy restrictivo)
-        # Solo incluir mapas para OpenAI (límite de tokens más alto)
         map_urls_for_ai = []
-        if not is_mini and not is_github:
+        if _AI_INCLUDE_MAPS:
             # Solo para OpenAI con gpt-4o: incluir URL del mapa análisis + mapas significativos
             if analysis_map_url:
                 map_urls_for_ai.append(analysis_map_url)
@@ -473,10 +696,6 @@ def _generate_report_payload(windy_model: str | None = None, include_ai: bool =
                 if u and u not in map_urls_for_ai:
                     map_urls_for_ai.append(u)
 
-        # Calcular clasificaciones de condiciones de vuelo antes de pasarlas a la IA
-        flight_cat_leas = classify_flight_category(metar_leas) if metar_leas else None
-        flight_cat_lemr = classify_flight_category(metar_lemr) if metar_lemr else None
-
         try:
             fused_ai = interpret_fused_forecast_with_ai(
                 metar_leas=metar_leas or "",
@@ -501,38 +720,20 @@ def _generate_report_payload(windy_model: str | None = None, include_ai: bool =
             )
             fused_ai = "\u26a0\ufe0f An\u00e1lisis IA no disponible temporalmente (error en todos los modelos)."
             model_used_for_ui = None
-    else:
-        # Si no se incluye IA, igualmente calcular las clasificaciones
-        flight_cat_leas = classify_flight_category(metar_leas) if metar_leas else None
-        flight_cat_lemr = classify_flight_category(metar_lemr) if metar_lemr else None
+
+    # Bloque "current" común al reporte y a /api/current (se construye una sola vez)
+    current_block = _build_current_block(current, _h_current)
 
     # Alimentar _OPENMETEO_CACHE con los datos ya obtenidos, para que el primer
     # /api/current tras un reinicio/ciclo no haga una llamada duplicada a Open-Meteo.
     if weather_data and weather_data.get("current"):
-        _flight_cat_lemr_live = classify_flight_category(metar_lemr) if metar_lemr else None
         _live_payload = {
             "fetched_at": now_local.isoformat(),
-            "current": {
-                "time": current.get("time"),
-                "temperature": current.get("temperature"),
-                "feels_like": current.get("feels_like"),
-                "humidity": current.get("humidity"),
-                "wind_speed_kmh": current.get("wind_speed"),
-                "wind_direction": current.get("wind_direction"),
-                "wind_gusts_kmh": current.get("wind_gusts"),
-                "pressure": current.get("pressure"),
-                "cloud_cover": current.get("cloud_cover"),
-                "cloud_cover_low": _h_current.get("cloud_cover_low"),
-                "cloud_cover_mid": _h_current.get("cloud_cover_mid"),
-                "cloud_cover_high": _h_current.get("cloud_cover_high"),
-                "precipitation": current.get("precipitation"),
-                "cape": current.get("cape"),
-                "condition": weather_code_to_description(current.get("weather_code")),
-            },
+            "current": current_block,
             "metar_lemr": {
                 "station": "LEMR",
                 "raw": metar_lemr,
-                "flight_category": _flight_cat_lemr_live,
+                "flight_category": flight_cat_lemr,
             },
         }
         _next_refresh = _next_live_refresh_boundary(now_local)
@@ -560,23 +761,7 @@ def _generate_report_payload(windy_model: str | None = None, include_ai: bool =
             "hours_invierno": config.LA_MORGAL_AERODROME["opening_hours"]["invierno"],
             "hours_verano": config.LA_MORGAL_AERODROME["opening_hours"]["verano"],
         },
-        "current": {
-            "time": current.get("time"),
-            "temperature": current.get("temperature"),
-            "feels_like": current.get("feels_like"),
-            "humidity": current.get("humidity"),
-            "wind_speed_kmh": current.get("wind_speed"),
-            "wind_direction": current.get("wind_direction"),
-            "wind_gusts_kmh": current.get("wind_gusts"),
-            "pressure": current.get("pressure"),
-            "cloud_cover": current.get("cloud_cover"),
-            "cloud_cover_low": _h_current.get("cloud_cover_low"),
-            "cloud_cover_mid": _h_current.get("cloud_cover_mid"),
-            "cloud_cover_high": _h_current.get("cloud_cover_high"),
-            "precipitation": current.get("precipitation"),
-            "cape": current.get("cape"),
-            "condition": weather_code_to_description(current.get("weather_code")),
-        },
+        "current": current_block,
         "metar": {
             "leas": {
                 "station": config.LEAS_ICAO,
@@ -612,17 +797,57 @@ def _generate_report_payload(windy_model: str | None = None, include_ai: bool =
     }
 
 
+def _save_cache_snapshot(cache_key: str, generated_at: str, payload: dict) -> None:
+    """Guarda el reporte en disco (escritura atómica); un fallo solo se registra."""
+    snapshot = {"cache_key": cache_key, "generated_at": generated_at, "payload": payload}
+    tmp_path = _CACHE_SNAPSHOT_PATH.with_suffix(".tmp")
+    try:
+        data = json.dumps(snapshot, ensure_ascii=False)
+        with _CACHE_SNAPSHOT_LOCK:
+            tmp_path.write_text(data, encoding="utf-8")
+            os.replace(tmp_path, _CACHE_SNAPSHOT_PATH)
+    except (OSError, TypeError, ValueError) as exc:
+        print(f"⚠️ No se pudo guardar la caché en disco: {exc}")
+
+
+def _load_cache_snapshot() -> None:
+    """
+    Carga el último reporte guardado si la caché en memoria está vacía.
+    Aunque sea de un ciclo anterior se sirve igual (get_report_payload lo regenera en background).
+    """
+    try:
+        snapshot = json.loads(_CACHE_SNAPSHOT_PATH.read_text(encoding="utf-8"))
+        generated_at = datetime.fromisoformat(snapshot["generated_at"])
+    except FileNotFoundError:
+        return
+    except (OSError, ValueError, KeyError, TypeError) as exc:
+        print(f"⚠️ Caché en disco ilegible, se ignora: {exc}")
+        return
+    if datetime.now(MADRID_TZ) - generated_at > _CACHE_SNAPSHOT_MAX_AGE:
+        return
+    global _CACHE_ENTRY
+    with _CACHE_LOCK:
+        if _CACHE_ENTRY is None and snapshot.get("payload"):
+            _CACHE_ENTRY = (snapshot.get("cache_key"), snapshot["generated_at"], snapshot["payload"])
+            print(f"💾 Caché restaurada desde disco (ciclo {_CACHE_ENTRY[0]})")
+
+
 def _background_regenerate_cache(cache_key: str, windy_model: str, include_ai: bool):
     """Regenera el reporte en background y actualiza la caché."""
+    global _CACHE_ENTRY
     try:
         now_local = datetime.now(MADRID_TZ)
         payload = _generate_report_payload(windy_model=windy_model, include_ai=include_ai)
         with _CACHE_LOCK:
-            _CACHE["cache_key"] = cache_key
-            _CACHE["generated_at"] = now_local.isoformat()
-            _CACHE["payload"] = payload
+            _CACHE_ENTRY = (cache_key, now_local.isoformat(), payload)
+            _REFRESH_FAILED_AT.clear()
+        _save_cache_snapshot(cache_key, now_local.isoformat(), payload)
         print(f"✅ Caché regenerada en background para ciclo {cache_key}")
     except Exception as exc:
+        with _CACHE_LOCK:
+            # Solo interesa el ciclo actual: descartar fallos de ciclos anteriores
+            _REFRESH_FAILED_AT.clear()
+            _REFRESH_FAILED_AT[cache_key] = _time.monotonic()
         print(f"❌ Error regenerando caché en background: {exc}")
         _tg_alert(
             f"Error critico en ciclo de actualizacion automatica (background). Error: {str(exc)[:300]}",
@@ -630,48 +855,124 @@ def _background_regenerate_cache(cache_key: str, windy_model: str, include_ai: b
             level="ERROR",
             exc=exc,
         )
+    finally:
+        with _CACHE_LOCK:
+            _REFRESH_IN_FLIGHT.discard(cache_key)
 
 
 def get_report_payload(force: bool = False, windy_model: str | None = None, include_ai: bool = True) -> dict:
+    global _CACHE_ENTRY
     now_local = datetime.now(MADRID_TZ)
     cycle_id = _build_cycle_id(now_local)
     selected_model = _sanitize_windy_model(windy_model)
     cache_key = f"{cycle_id}|{selected_model}"
 
-    with _CACHE_LOCK:
+    # Lectura sin lock de la entrada publicada
+    entry = _CACHE_ENTRY
+    if not force and entry is not None:
+        cached_key, _, cached_payload = entry
         # Caché válida: mismo ciclo
-        if not force and _CACHE["payload"] and _CACHE["cache_key"] == cache_key:
-            return _CACHE["payload"]
-        
+        if cached_key == cache_key:
+            return cached_payload
+
         # Caché desactualizada: nuevo ciclo pero tenemos datos viejos
-        if not force and _CACHE["payload"] and _CACHE["cache_key"] != cache_key:
-            print(f"🔄 Nuevo ciclo detectado ({cache_key}), mostrando datos previos mientras se actualiza...")
-            old_payload = _CACHE["payload"]
-            # Lanzar regeneración en background
-            Thread(target=_background_regenerate_cache, args=(cache_key, selected_model, include_ai), daemon=True).start()
-            return old_payload
-        
-        # Sin caché o forzado: generación síncrona
+        with _CACHE_LOCK:
+            # Lanzar regeneración en background (una sola por ciclo aunque lleguen más peticiones,
+            # y no antes de _REFRESH_RETRY_DELAY si la anterior falló)
+            failed_at = _REFRESH_FAILED_AT.get(cache_key)
+            retry_ok = failed_at is None or _time.monotonic() - failed_at >= _REFRESH_RETRY_DELAY
+            if cache_key not in _REFRESH_IN_FLIGHT and retry_ok:
+                print(f"🔄 Nuevo ciclo detectado ({cache_key}), mostrando datos previos mientras se actualiza...")
+                _REFRESH_IN_FLIGHT.add(cache_key)
+                _REFRESH_POOL.submit(_background_regenerate_cache, cache_key, selected_model, include_ai)
+        return cached_payload
+
+    # Sin caché o forzado: generación síncrona (una a la vez)
+    with _CACHE_BUILD_LOCK:
+        # Otra petición puede haberla generado mientras esperábamos
+        entry = _CACHE_ENTRY
+        if not force and entry is not None and entry[0] == cache_key:
+            return entry[2]
         payload = _generate_report_payload(windy_model=selected_model, include_ai=include_ai)
-        _CACHE["cache_key"] = cache_key
-        _CACHE["generated_at"] = now_local.isoformat()
-        _CACHE["payload"] = payload
-        return payload
+        with _CACHE_LOCK:
+            _CACHE_ENTRY = (cache_key, now_local.isoformat(), payload)
+    _save_cache_snapshot(cache_key, now_local.isoformat(), payload)
+    return payload
+
+
+# Margen tras el cambio de hora y reintento mientras la caché no esté al día
+_WARMER_BOUNDARY_DELAY = 5  # segundos
+_WARMER_RETRY_INTERVAL = 60  # segundos
+
+
+def _seconds_until_next_cycle(now_local: datetime) -> float:
+    """Segundos hasta el siguiente HH:00:05 local (los ciclos cambian a hora en punto)."""
+    next_hour = (now_local + timedelta(hours=1)).replace(
+        minute=0, second=_WARMER_BOUNDARY_DELAY, microsecond=0
+    )
+    return max(1.0, (next_hour - now_local).total_seconds())
+
+
+def _seconds_until_cycle_change(now_local: datetime) -> int:
+    """Segundos hasta que _build_cycle_id cambie (de 23:00 a 05:59 sigue el ciclo de las 23)."""
+    cycle_id = _build_cycle_id(now_local)
+    boundary = now_local.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    while _build_cycle_id(boundary) == cycle_id:
+        boundary += timedelta(hours=1)
+    # Diferencia en UTC: con el mismo tzinfo Python resta horas de reloj (falla en cambios de hora)
+    return max(0, int((boundary.astimezone(UTC_TZ) - now_local.astimezone(UTC_TZ)).total_seconds()))
+
+
+def _current_cycle_max_age(payload: dict, selected_model: str) -> int | None:
+    """max-age para `payload` si es el reporte publicado del ciclo vigente; None si es una copia vieja."""
+    entry = _CACHE_ENTRY
+    now_local = datetime.now(MADRID_TZ)
+    if entry is None or entry[2] is not payload or entry[0] != f"{_build_cycle_id(now_local)}|{selected_model}":
+        return None
+    return _seconds_until_cycle_change(now_local)
+
+
+def _cache_public(response, max_age: int | None):
+    """Marca la respuesta como cacheable `max_age` segundos (set_security_headers la respeta)."""
+    if max_age:
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+    return response
 
 
 def _cycle_warmer_loop():
+    selected_model = _sanitize_windy_model(config.WINDY_MODEL)
     while True:
         try:
-            get_report_payload(force=False, windy_model=config.WINDY_MODEL, include_ai=True)
+            # El run de Ogimet (07/19 UTC) y la fecha local cambian en frontera de hora:
+            # dejar la semana ya construida y serializada antes de la primera petición
+            _ogimet_week_json(*_ogimet_week_key())
+        except Exception as exc:
+            print(f"Ogimet warmer error: {exc}")
+        try:
+            get_report_payload(force=False, windy_model=selected_model, include_ai=True)
         except Exception as exc:
             print(f"Cycle warmer error: {exc}")
-        _time.sleep(60)
+        now_local = datetime.now(MADRID_TZ)
+        entry = _CACHE_ENTRY
+        up_to_date = entry is not None and entry[0] == f"{_build_cycle_id(now_local)}|{selected_model}"
+        # Al día: dormir hasta el siguiente ciclo. Si la regeneración sigue en curso
+        # o ha fallado, volver a comprobar en un minuto.
+        wait = _seconds_until_next_cycle(now_local)
+        if not up_to_date:
+            wait = min(wait, _WARMER_RETRY_INTERVAL)
+        _time.sleep(wait)
 
 
 def _start_cycle_warmer_once():
     global _WARMER_STARTED
     if _WARMER_STARTED:
         return
+    # Con varios workers de Gunicorn solo el WORKER_ID=0 precalienta la caché; el
+    # WORKER_ID lo asigna gunicorn.conf.py (sin él se asume proceso único)
+    if os.environ.get("WORKER_ID", "0") != "0":
+        return
+    _load_cache_snapshot()
     with _CACHE_LOCK:
         if _WARMER_STARTED:
             return
@@ -694,15 +995,24 @@ def favicon():
 @app.get("/")
 @limiter.limit("100 per minute")
 def index():
+    global _RENDERED_INDEX
     _start_cycle_warmer_once()
-    with _CACHE_LOCK:
-        payload = _CACHE.get("payload")
+    entry = _CACHE_ENTRY
+    payload = entry[2] if entry is not None else None
     if not payload:
         payload = get_report_payload(force=False, windy_model=config.WINDY_MODEL, include_ai=True)
-    return render_template(
-        "index.html",
-        data=payload,
-    )
+    # El HTML solo depende del payload: se renderiza una vez por payload generado
+    rendered = _RENDERED_INDEX
+    if rendered is not None and rendered[0] is payload:
+        html = rendered[1]
+    else:
+        html = render_template(
+            "index.html",
+            data=payload,
+        )
+        _RENDERED_INDEX = (payload, html)
+    max_age = _current_cycle_max_age(payload, _sanitize_windy_model(config.WINDY_MODEL))
+    return _cache_public(app.make_response(html), max_age)
 
 
 @app.get("/api/report")
@@ -711,7 +1021,15 @@ def api_report():
     # Parámetro force eliminado: la caché se actualiza automáticamente cada ciclo horario
     windy_model = request.args.get("windy_model", config.WINDY_MODEL)
     payload = get_report_payload(force=False, windy_model=windy_model, include_ai=True)
-    return jsonify(payload)
+    # ETag de la generación servida (ciclo + instante): se compara por identidad con la
+    # entrada publicada, así una copia vieja servida mientras se regenera no hereda el
+    # ETag del ciclo nuevo
+    entry = _CACHE_ENTRY
+    if entry is None or entry[2] is not payload:
+        return jsonify(payload)
+    etag = f"{entry[0]}|{entry[1]}"
+    response = _not_modified(etag) or _with_etag(jsonify(payload), etag)
+    return _cache_public(response, _current_cycle_max_age(payload, _sanitize_windy_model(windy_model)))
 
 
 def _get_live_metar_data() -> dict:
@@ -779,11 +1097,7 @@ def _get_live_openmeteo_data() -> dict:
 
         current = weather_data.get("current", {})
         hourly_om = weather_data.get("hourly_forecast", [])
-        _now_hour_str = current.get("time", "")[:13]
-        _h_current = next(
-            (h for h in hourly_om if h.get("time", "")[:13] == _now_hour_str),
-            hourly_om[0] if hourly_om else {}
-        )
+        _h_current = _current_hour_row(current, hourly_om)
         _visibility_km = _h_current.get("visibility")
         _dewpoint_c = _h_current.get("dewpoint")
         _cloud_cover_low = _h_current.get("cloud_cover_low")
@@ -799,23 +1113,7 @@ def _get_live_openmeteo_data() -> dict:
 
         data = {
             "fetched_at": now_local.isoformat(),
-            "current": {
-                "time": current.get("time"),
-                "temperature": current.get("temperature"),
-                "feels_like": current.get("feels_like"),
-                "humidity": current.get("humidity"),
-                "wind_speed_kmh": current.get("wind_speed"),
-                "wind_direction": current.get("wind_direction"),
-                "wind_gusts_kmh": current.get("wind_gusts"),
-                "pressure": current.get("pressure"),
-                "cloud_cover": current.get("cloud_cover"),
-                "cloud_cover_low": _h_current.get("cloud_cover_low"),
-                "cloud_cover_mid": _h_current.get("cloud_cover_mid"),
-                "cloud_cover_high": _h_current.get("cloud_cover_high"),
-                "precipitation": current.get("precipitation"),
-                "cape": current.get("cape"),
-                "condition": weather_code_to_description(current.get("weather_code")),
-            },
+            "current": _build_current_block(current, _h_current),
             "metar_lemr": {
                 "station": "LEMR",
                 "raw": metar_lemr,
@@ -837,13 +1135,36 @@ def api_current():
     return jsonify(data)
 
 
+def _json_response(obj, status: int = 200):
+    """Respuesta JSON en UTF-8 sin escapar (orjson si está instalado) para las APIs ligeras."""
+    return app.response_class(json_codec.dumps(obj), status=status, mimetype='application/json')
+
+
+def _not_modified(etag: str):
+    """304 sin cuerpo si el cliente ya tiene la versión `etag`; None si hay que responder entera."""
+    if not request.if_none_match.contains(etag):
+        return None
+    return _with_etag(app.response_class(status=304), etag)
+
+
+def _with_etag(response, etag: str):
+    response.set_etag(etag)
+    return response
+
+
 @app.get("/api/windy")
 @limiter.limit("10 per minute")
 def api_windy():
     windy_model = request.args.get("windy_model", config.WINDY_MODEL)
     selected_model = _sanitize_windy_model(windy_model)
-    windy_section = _build_windy_section(selected_model)
-    return jsonify({"windy": windy_section})
+    cycle_id = _build_cycle_id(datetime.now(MADRID_TZ))
+    windy_section = _get_windy_section(selected_model)
+    # Solo las secciones con datos se cachean por ciclo; un error no lleva ETag
+    if not windy_section.get("hourly"):
+        return _json_response({"windy": windy_section})
+    etag = f"{cycle_id}|{selected_model}"
+    response = _not_modified(etag) or _with_etag(_json_response({"windy": windy_section}), etag)
+    return _cache_public(response, _seconds_until_cycle_change(datetime.now(MADRID_TZ)))
 
 
 @app.get("/api/ogimet/week")
@@ -851,8 +1172,19 @@ def api_windy():
 def api_ogimet_week():
     """API endpoint para la vista semanal de Ogimet (7 días, 1 mapa/día)"""
     try:
-        forecast_data = get_ogimet_week_forecast()
-        return jsonify(forecast_data)
+        date_str, run, today = _ogimet_week_key()
+        # La respuesta solo depende de la clave: ETag estable → 304 sin cuerpo mientras no cambie
+        etag = f"{date_str}{run}-{today:%Y%m%d}"
+        if request.accept_encodings['gzip'] > 0:
+            response = app.response_class(_ogimet_week_gzip(date_str, run, today), mimetype='application/json')
+            response.headers['Content-Encoding'] = 'gzip'
+            etag += "-gz"
+        else:
+            response = app.response_class(_ogimet_week_json(date_str, run, today), mimetype='application/json')
+        response.vary.add('Accept-Encoding')
+        response.set_etag(etag)
+        _cache_public(response, min(_OGIMET_WEEK_MAX_AGE, _seconds_until_ogimet_week_change()))
+        return response.make_conditional(request)
     except Exception as e:
         _tg_alert(
             f"Ogimet /api/ogimet/week lanzo excepcion: {str(e)[:300]}",
@@ -860,108 +1192,195 @@ def api_ogimet_week():
             level="ERROR",
             exc=e,
         )
-        return jsonify({
+        return _json_response({
             'success': False,
             'error': str(e)
-        }), 500
+        }, status=500)
+
+
+def _probe_ogimet_url(url: str):
+    """Comprueba si una imagen de Ogimet está publicada. Devuelve el código HTTP (200/206 = sí) o 'ERROR'."""
+    try:
+        # stream=True: no se lee cuerpo alguno; el with devuelve la conexión al pool.
+        # requests mantiene el método HEAD al seguir redirecciones 301/302.
+        with _OGIMET_SESSION.head(url, timeout=5, allow_redirects=True, stream=True) as response:
+            status = response.status_code
+        if status in (405, 501):
+            # Servidor sin soporte de HEAD: pedir solo el primer byte (206 = publicada)
+            with _OGIMET_SESSION.get(url, headers={'Range': 'bytes=0-0'}, timeout=5, stream=True) as response:
+                status = response.status_code
+        return status
+    except Exception:
+        return 'ERROR'
 
 
 @app.get("/api/ogimet/debug")
 def api_ogimet_debug():
     """Endpoint de debug para verificar URLs de Ogimet"""
-    import requests
     try:
         forecast_data = get_ogimet_week_forecast()
         
-        # Verificar disponibilidad de cada imagen
-        results = []
-        for day in forecast_data['week']:
-            url = day['image_url']
-            try:
-                response = requests.head(url, timeout=5, allow_redirects=True)
-                status = response.status_code
-                available = status == 200
-            except Exception as e:
-                status = 'ERROR'
-                available = False
-            
-            results.append({
+        # Verificar disponibilidad de cada imagen (sondas HEAD en paralelo)
+        week = forecast_data['week']
+        with ThreadPoolExecutor(max_workers=len(week) or 1) as pool:
+            statuses = list(pool.map(_probe_ogimet_url, [day['source_url'] for day in week]))
+
+        results = [
+            {
                 'day': day['day_label'],
                 'date': day['date'],
                 'projection_hours': day['projection_hours'],
-                'url': url,
+                'url': day['source_url'],
                 'status': status,
-                'available': available
-            })
+                'available': status in (200, 206)
+            }
+            for day, status in zip(week, statuses)
+        ]
         
-        return jsonify({
+        return _json_response({
             'success': True,
             'run_info': forecast_data['run_info'],
             'images': results,
-            'current_time_utc': datetime.now(ZoneInfo("UTC")).isoformat()
+            'current_time_utc': datetime.now(UTC_TZ).isoformat()
         })
     except Exception as e:
-        return jsonify({
+        return _json_response({
             'success': False,
             'error': str(e)
-        }), 500
+        }, status=500)
+
+
+@app.get("/cache/ogimet/<date_str>/<run>/<int:hours>.jpg")
+@limiter.limit("60 per minute")
+def ogimet_image(date_str: str, run: str, hours: int):
+    """Sirve un mapa Ogimet desde la caché en disco, descargándolo la primera vez."""
+    if len(date_str) != 8 or not date_str.isdigit() or run not in ("00", "12") or hours > 384:
+        abort(404)
+    source_url = _build_ogimet_image_url(date_str, run, hours)
+    # Solo se cachean las imágenes de la vista semanal (run vigente y anterior): el resto
+    # va directo a Ogimet y no puede desalojar las de la semana
+    servable_runs = _servable_ogimet_runs()
+    if f"{date_str}{run}" not in servable_runs or hours not in _OGIMET_PROJECTION_HOURS:
+        return redirect(source_url)
+    path = _OGIMET_IMG_CACHE_DIR / f"{date_str}{run}H{hours:03d}.jpg"
+    if not path.is_file():
+        _OGIMET_IMG_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        # Fichero temporal propio: varias descargas simultáneas no comparten .tmp
+        tmp_path = path.with_suffix(f".{os.getpid()}-{get_ident()}.tmp")
+        try:
+            with _OGIMET_SESSION.get(source_url, timeout=(5, 20), stream=True) as resp:
+                if resp.status_code != 200 or not resp.headers.get("Content-Type", "").startswith("image/"):
+                    # Imagen aún no publicada o error de Ogimet: que el navegador lo intente directamente
+                    return redirect(source_url)
+                with open(tmp_path, "wb") as fh:
+                    for chunk in resp.iter_content(chunk_size=64 * 1024):
+                        fh.write(chunk)
+            os.replace(tmp_path, path)
+        except (requests.RequestException, OSError):
+            tmp_path.unlink(missing_ok=True)
+            return redirect(source_url)
+        with _OGIMET_IMG_LOCK:
+            _prune_ogimet_image_cache(servable_runs)
+    try:
+        return send_file(path, mimetype="image/jpeg", max_age=_OGIMET_IMG_MAX_AGE)
+    except FileNotFoundError:
+        # Borrada por la poda justo al cambiar de run: que el navegador vaya a Ogimet
+        return redirect(source_url)
+
+
+# Ficheros de static/ servidos en la raíz: no cambian en ejecución, se leen una vez
+# y se sirven desde memoria con ETag (y la misma caché de 24h que /static/).
+_ROOT_STATIC_PATHS = frozenset((
+    "/robots.txt", "/sitemap.xml", "/opensearch.xml", "/humans.txt", "/manifest.json",
+))
+
+
+@lru_cache(maxsize=None)
+def _read_root_static_file(filename: str) -> tuple[bytes, str]:
+    """Contenido y ETag de un fichero de static/ servido en la raíz del sitio."""
+    body = (Path(app.static_folder) / filename).read_bytes()
+    return body, hashlib.md5(body).hexdigest()
+
+
+def _serve_root_static_file(filename: str, mimetype: str):
+    """Sirve un fichero raíz desde memoria, respondiendo 304 a If-None-Match."""
+    body, etag = _read_root_static_file(filename)
+    response = app.response_class(body, mimetype=mimetype)
+    response.set_etag(etag)
+    return response.make_conditional(request)
 
 
 @app.get("/robots.txt")
 def robots_txt():
     """Sirve el archivo robots.txt para SEO."""
-    from flask import send_from_directory
-    return send_from_directory('static', 'robots.txt', mimetype='text/plain')
+    return _serve_root_static_file('robots.txt', mimetype='text/plain')
 
 
 @app.get("/sitemap.xml")
 def sitemap_xml():
     """Sirve el archivo sitemap.xml para SEO."""
-    from flask import send_from_directory
-    return send_from_directory('static', 'sitemap.xml', mimetype='application/xml')
+    return _serve_root_static_file('sitemap.xml', mimetype='application/xml')
 
 
 @app.get("/opensearch.xml")
 def opensearch_xml():
     """Sirve el archivo opensearch.xml para búsqueda personalizada en navegadores."""
-    from flask import send_from_directory
-    return send_from_directory('static', 'opensearch.xml', mimetype='application/opensearchdescription+xml')
+    return _serve_root_static_file('opensearch.xml', mimetype='application/opensearchdescription+xml')
 
 
 @app.get("/humans.txt")
 def humans_txt():
     """Sirve el archivo humans.txt con créditos y información del sitio."""
-    from flask import send_from_directory
-    return send_from_directory('static', 'humans.txt', mimetype='text/plain')
+    return _serve_root_static_file('humans.txt', mimetype='text/plain')
 
 
 @app.get("/manifest.json")
 def manifest_json():
     """Sirve el archivo manifest.json para PWA."""
-    from flask import send_from_directory
-    return send_from_directory('static', 'manifest.json', mimetype='application/manifest+json')
+    return _serve_root_static_file('manifest.json', mimetype='application/manifest+json')
+
+
+# Cabeceras de seguridad comunes a todas las respuestas
+_SECURITY_HEADERS = (
+    ('X-Content-Type-Options', 'nosniff'),
+    ('X-Frame-Options', 'SAMEORIGIN'),
+    ('X-XSS-Protection', '1; mode=block'),
+    ('Referrer-Policy', 'strict-origin-when-cross-origin'),
+)
 
 
 @app.after_request
 def set_security_headers(response):
     """Añade cabeceras de seguridad y SEO a todas las respuestas."""
-    # Seguridad
-    response.headers['X-Content-Type-Options'] = 'nosniff'
-    response.headers['X-Frame-Options'] = 'SAMEORIGIN'
-    response.headers['X-XSS-Protection'] = '1; mode=block'
-    response.headers['Referrer-Policy'] = 'strict-origin-when-cross-origin'
+    headers = response.headers
+    path = request.path
+    # Seguridad: asignación (no extend) para no duplicarlas si la respuesta ya trae alguna
+    for name, value in _SECURITY_HEADERS:
+        headers[name] = value
 
     # Caché diferenciada:
-    # - /static/: recursos inmutables, se pueden cachear agresivamente (24h)
+    # - /static/ y ficheros raíz (robots.txt...): recursos inmutables, se pueden cachear agresivamente (24h)
+    # - Vistas que ya fijaron Cache-Control (/, /api/report, /api/windy, /api/ogimet/week):
+    #   max-age acotado al próximo cambio de ciclo/run; una copia vieja servida mientras se
+    #   regenera nunca lo lleva, así que no se queda en caché pasado el cambio.
     # - Todo lo demás (HTML, /api/*): contenido dinámico meteorológico.
     #   "no-store" evita que Cloudflare (y el navegador) sirva datos viejos
     #   cuando el origen tarda o falla. Sin esto, Cloudflare puede estar
     #   3 horas sirviendo la versión de las 20:00 aunque sean las 23:00.
-    if request.path.startswith('/static/'):
-        response.headers['Cache-Control'] = 'public, max-age=86400'
+    if path.startswith('/static/') or path in _ROOT_STATIC_PATHS:
+        headers['Cache-Control'] = 'public, max-age=86400'
+    elif path.startswith('/cache/') and response.status_code == 200:
+        # Mapas Ogimet: la imagen de un run/proyección no cambia una vez publicada
+        headers['Cache-Control'] = f'public, max-age={_OGIMET_IMG_MAX_AGE}'
+    elif 'Cache-Control' in headers:
+        pass
+    elif headers.get('ETag') and response.status_code in (200, 304):
+        # Respuestas con ETag (/api/report, /api/windy, /api/ogimet/week): el navegador puede guardarlas
+        # pero debe revalidar siempre; un 304 confirma la copia sin reenviar el cuerpo.
+        headers['Cache-Control'] = 'no-cache'
     else:
-        response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate'
-        response.headers['Pragma'] = 'no-cache'
+        headers['Cache-Control'] = 'no-store, no-cache, must-revalidate'
+        headers['Pragma'] = 'no-cache'
 
     # HSTS solo en producción (cuando uses HTTPS)
     # response.headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
@@ -4,13 +4,12 @@ Servicio para consumir Windy Point Forecast API.
 from datetime import datetime
 from math import atan2, degrees, sqrt
 from typing import Dict, List, Optional
-from zoneinfo import ZoneInfo
 
 import requests
 
 import config
-
-MADRID_TZ = ZoneInfo("Europe/Madrid")
+import json_codec
+from timezones import MADRID_TZ, UTC_TZ
 
 
 def _windy_key() -> str:
@@ -58,28 +57,40 @@ def _build_day_summary(hourly: List[dict]) -> List[dict]:
 
     result = []
     for day, rows in sorted(grouped.items())[:7]:  # Extendido a 7 días
-        max_wind = max((r.get("wind_kmh") or 0) for r in rows)
-        max_gust = max((r.get("gust_kmh") or 0) for r in rows)
-        avg_temp = round(sum((r.get("temp_c") or 0) for r in rows) / max(len(rows), 1), 1)
-        total_precip = round(sum((r.get("precip_3h_mm") or 0) for r in rows), 1)
-
-        # Desglose mañana (09-13h) vs tarde (14-21h) para detectar tendencias
-        man_rows  = [r for r in rows if r.get("time_local") and  9 <= int(r["time_local"][11:13]) <= 13]
-        tard_rows = [r for r in rows if r.get("time_local") and 14 <= int(r["time_local"][11:13]) <= 21]
-        man_gust  = round(max((r.get("gust_kmh") or 0) for r in man_rows),  1) if man_rows  else None
-        tard_gust = round(max((r.get("gust_kmh") or 0) for r in tard_rows), 1) if tard_rows else None
+        # Una sola pasada por día: máximos, sumas y desglose mañana (09-13h) / tarde (14-21h)
+        max_wind = max_gust = 0
+        temp_sum = precip_sum = 0
+        man_gust = tard_gust = None
+        for r in rows:
+            wind = r.get("wind_kmh") or 0
+            gust = r.get("gust_kmh") or 0
+            if wind > max_wind:
+                max_wind = wind
+            if gust > max_gust:
+                max_gust = gust
+            temp_sum += r.get("temp_c") or 0
+            precip_sum += r.get("precip_3h_mm") or 0
+            time_local = r.get("time_local")
+            if time_local:
+                hour = int(time_local[11:13])
+                if 9 <= hour <= 13:
+                    if man_gust is None or gust > man_gust:
+                        man_gust = gust
+                elif 14 <= hour <= 21:
+                    if tard_gust is None or gust > tard_gust:
+                        tard_gust = gust
 
         entry = {
             "date": day,
             "max_wind_kmh": round(max_wind, 1),
             "max_gust_kmh": round(max_gust, 1),
-            "avg_temp_c": avg_temp,
-            "precip_total_mm": total_precip,
+            "avg_temp_c": round(temp_sum / max(len(rows), 1), 1),
+            "precip_total_mm": round(precip_sum, 1),
         }
         if man_gust is not None:
-            entry["gust_man_max"] = man_gust
+            entry["gust_man_max"] = round(man_gust, 1)
         if tard_gust is not None:
-            entry["gust_tard_max"] = tard_gust
+            entry["gust_tard_max"] = round(tard_gust, 1)
         result.append(entry)
     return result
 
@@ -150,7 +161,7 @@ def get_windy_point_forecast(lat: float, lon: float, model: Optional[str] = None
             fallback_payload["error"] = f"Windy Point Forecast HTTP {response.status_code}"
             return fallback_payload
 
-        data = response.json()
+        data = json_codec.loads(response.content)
 
         ts = _extract_series(data, "ts")
         wind_u = _extract_series(data, "wind_u-surface")
@@ -173,7 +184,7 @@ def get_windy_point_forecast(lat: float, lon: float, model: Optional[str] = None
 
         hourly = []
         for i in range(points):
-            dt_local = datetime.fromtimestamp(ts[i] / 1000, tz=ZoneInfo("UTC")).astimezone(MADRID_TZ)
+            dt_local = datetime.fromtimestamp(ts[i] / 1000, tz=UTC_TZ).astimezone(MADRID_TZ)
             wind_kmh, wind_dir = _vector_to_wind_kmh_and_dir(wind_u[i], wind_v[i])
             gust_kmh = (gust[i] * 3.6) if i < len(gust) and gust[i] is not None else None
 
@@ -0,0 +1,8 @@
+"""
+Punto de entrada WSGI para producción (Gunicorn)
+
+    gunicorn --config gunicorn.conf.py --workers 1 --worker-class gthread --threads 8 --timeout 60 wsgi:app
+"""
+from web_app import app
+
+__all__ = ["app"]